@@ -0,0 +1,102 @@
+from datetime import datetime
+
+import numpy as np
+
+from rwsch.history import ReviewBatch
+
+# Классы активности в порядке стратегий examples.serp.strategies, последний - сущности без подходящей стратегии
+ACTIVITIES = ['high', 'medium', 'past', 'high_low', 'low_low', 'none']
+
+# Возраст отзывов (в днях, включительно) для последнего года, второго и третьего года и для отзывов старше трех лет.
+# Границы лет не используются, так как окна стратегий их не включают
+AGE_RANGES = np.array([[1, 364], [366, 729], [731, 1094], [1100, 3650]])
+
+# Распределение оценок от 1 до 5
+RATING_WEIGHTS = [0.1, 0.1, 0.15, 0.25, 0.4]
+
+
+def _base_counts(activity, size, rng):
+    """Минимальное количество отзывов по годам, при котором сущность попадает в свой класс,
+    и индекс колонки, в которую добавляются остальные отзывы"""
+
+    def uniform(lo, hi):
+        return rng.integers(lo, hi, size)
+
+    if activity == 'high':
+        return np.stack([np.full(size, 24), uniform(0, 12), uniform(0, 12)], axis=1), 0
+    elif activity == 'medium':
+        return np.stack([uniform(6, 24), uniform(0, 12), uniform(0, 12)], axis=1), 3
+    elif activity == 'past':
+        return np.stack([uniform(1, 6), np.full(size, 6), uniform(0, 6)], axis=1), 1
+    elif activity == 'high_low':
+        return np.stack([uniform(3, 6), uniform(3, 6), uniform(3, 6)], axis=1), 3
+    elif activity == 'low_low':
+        return np.stack([uniform(1, 3), uniform(1, 3), uniform(1, 3)], axis=1), 3
+    elif activity == 'none':
+        return np.stack([np.zeros(size, dtype=np.int64), np.zeros(size, dtype=np.int64), uniform(0, 3)], axis=1), 3
+
+    raise ValueError('Unknown activity: %s' % activity)
+
+
+def generate_batch(activities, n_reviews, rng: np.random.Generator, reference_date=None) -> ReviewBatch:
+    """Синтетические истории для множества сущностей.
+    activities - класс активности каждой сущности (из ACTIVITIES), n_reviews - желаемое количество отзывов.
+    Если для класса нужно больше отзывов, чем запрошено, берется минимально необходимое количество"""
+
+    if reference_date is None:
+        reference_date = datetime.now().date()
+
+    activities = np.asarray(activities)
+    n_reviews = np.asarray(n_reviews, dtype=np.int64)
+
+    counts = np.zeros((len(activities), 4), dtype=np.int64)
+    for activity in ACTIVITIES:
+        selected = np.flatnonzero(activities == activity)
+        if not selected.size:
+            continue
+
+        base, extra_column = _base_counts(activity, selected.size, rng)
+        counts[selected, :3] = base
+        counts[selected, extra_column] += np.maximum(0, n_reviews[selected] - base.sum(axis=1))
+
+    per_review = np.repeat(np.tile(np.arange(0, 4), len(activities)), counts.ravel())
+    ages = rng.integers(AGE_RANGES[per_review, 0], AGE_RANGES[per_review, 1] + 1)
+
+    offsets = np.zeros(len(activities) + 1, dtype=np.int64)
+    np.cumsum(counts.sum(axis=1), out=offsets[1:])
+
+    return ReviewBatch(
+        dates=np.datetime64(reference_date, 'D') - ages,
+        offsets=offsets,
+        ratings=rng.choice(np.arange(1, 6), size=len(ages), p=RATING_WEIGHTS),
+        today=reference_date,
+    )
+
+
+def generate_fleet(n_entities: int, rng: np.random.Generator, max_reviews: int = 100000,
+                   reference_date=None) -> (np.ndarray, ReviewBatch):
+    """Парк сущностей со случайными классами активности и логарифмически равномерным
+    количеством отзывов от 1 до max_reviews. Возвращает классы и пакет историй"""
+
+    activities = rng.choice(ACTIVITIES, size=n_entities)
+    n_reviews = np.exp(rng.uniform(0, np.log(max_reviews), n_entities)).astype(np.int64)
+
+    return activities, generate_batch(activities, n_reviews, rng, reference_date)
+
+
+def generate_history(activity: str, n_reviews: int, rng: np.random.Generator, reference_date=None):
+    """Синтетическая история одной сущности"""
+    return generate_batch([activity], [n_reviews], rng, reference_date).history(0)
+
+
+class Item:
+    """Отзыв в том виде, в котором его передают вызывающие: обычный объект с атрибутами date и rating"""
+
+    def __init__(self, date, rating):
+        self.date = date
+        self.rating = rating
+
+
+def generate_items(activity: str, n_reviews: int, rng: np.random.Generator, reference_date=None):
+    """Синтетическая история одной сущности в виде списка объектов отзывов"""
+    return [Item(date, rating) for date, rating in generate_history(activity, n_reviews, rng, reference_date)]
@@ -0,0 +1,175 @@
+"""Бенчмарки горячих путей rwsch на синтетических историях.
+
+Запуск:
+    python -m benchmarks.run --entities 10000 --output bench.json
+    python -m benchmarks.run --compare bench.json
+
+Результаты пишутся в JSON, чтобы их можно было сравнивать между запусками.
+Замеры с параметром input='items' получают список объектов отзывов, как большинство вызывающих,
+остальные - готовую ReviewHistory. Эталонные результаты с параметрами по умолчанию
+лежат в benchmarks/baseline.json: python -m benchmarks.run --compare benchmarks/baseline.json"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import date
+
+import numpy as np
+
+from benchmarks.generator import ACTIVITIES, generate_fleet, generate_history, generate_items
+from examples.serp import strategies
+from rwsch.history import ReviewHistory
+from rwsch.models import SchedulingService, ForecastLimitItem, distribute
+
+STRATEGY_LIST = [
+    strategies.HighActivity,
+    strategies.MediumActivity,
+    strategies.PastActivity,
+    strategies.HighLowActivity,
+    strategies.LowLowActivity,
+]
+
+REFERENCE_DATE = date(2019, 6, 1)
+
+
+def measure(name, func, repeat: int = 5, setup=None, **params):
+    """Время одного вызова func: лучшее и среднее из repeat запусков.
+    Если передан setup, его результат передается в func, а время подготовки не учитывается"""
+
+    timings = []
+    for _ in range(0, repeat):
+        args = (setup(),) if setup is not None else ()
+
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+
+    return {
+        'name': name,
+        'params': params,
+        'repeat': repeat,
+        'best_s': min(timings),
+        'mean_s': sum(timings) / len(timings),
+    }
+
+
+def run_benchmarks(n_entities: int, sizes, seed: int, repeat: int, fleet_reviews: int):
+    rng = np.random.default_rng(seed)
+    service = SchedulingService(STRATEGY_LIST, reference_date=REFERENCE_DATE)
+
+    results = []
+
+    for activity in ACTIVITIES[:-1]:
+        for size in sizes:
+            history = generate_history(activity, size, rng, REFERENCE_DATE)
+            strategy = service.get_strategy(history, rng=np.random.default_rng(seed))
+            params = {'activity': activity, 'reviews': len(history)}
+
+            # Каждый замер получает новую копию истории, чтобы не измерять закешированный профиль
+            def fresh():
+                return generate_history(activity, size, np.random.default_rng(seed), REFERENCE_DATE)
+
+            # Преобразование списка объектов отзывов - вход, с которым работает большинство вызывающих
+            items = generate_items(activity, size, np.random.default_rng(seed), REFERENCE_DATE)
+            results.append(measure('from_items', lambda: ReviewHistory.from_items(items), repeat, **params))
+
+            results.append(measure('get_strategy', service.get_strategy, repeat, fresh, **params))
+            results.append(measure('get_strategy', lambda: service.get_strategy(items), repeat,
+                                   input='items', **params))
+            results.append(measure('get_schedule', strategy.get_schedule, repeat, fresh, **params))
+            results.append(measure('_get_projection', strategy._get_projection, repeat, fresh, **params))
+
+            for limit_item, limit_value in [(ForecastLimitItem.PERIOD, 12), (ForecastLimitItem.RATING, 5)]:
+                results.append(measure(
+                    'get_forecast',
+                    lambda h: strategy.get_forecast(h, limit_item, limit_value),
+                    repeat,
+                    fresh,
+                    limit=limit_item.name,
+                    **params,
+                ))
+                results.append(measure(
+                    'get_forecast',
+                    lambda: strategy.get_forecast(items, limit_item, limit_value),
+                    repeat,
+                    limit=limit_item.name,
+                    input='items',
+                    **params,
+                ))
+
+    for n_items in [1, 100, 10000]:
+        results.append(measure('distribute', lambda: distribute(n_items, 12, rng=rng), repeat, items=n_items))
+
+    activities, batch = generate_fleet(n_entities, rng, max_reviews=fleet_reviews, reference_date=REFERENCE_DATE)
+    params = {'entities': n_entities, 'reviews': len(batch.dates)}
+
+    def fresh_batch():
+        # Сбрасываем закешированные окна, чтобы каждый замер считал их заново
+        batch._windows.clear()
+        return batch
+
+    results.append(measure('get_strategies', service.get_strategies, repeat, fresh_batch, **params))
+
+    return results
+
+
+def compare(previous, current):
+    """Сравнение двух запусков: отношение лучшего времени для совпадающих замеров"""
+
+    def key(result):
+        return result['name'], json.dumps(result['params'], sort_keys=True)
+
+    baseline = {key(r): r for r in previous['results']}
+
+    for result in current['results']:
+        old = baseline.get(key(result))
+        if old is None:
+            continue
+
+        ratio = result['best_s'] / old['best_s'] if old['best_s'] else float('inf')
+        print('%-16s %-60s %10.6fs -> %10.6fs  x%.2f' % (
+            result['name'], json.dumps(result['params'], sort_keys=True), old['best_s'], result['best_s'], ratio
+        ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='rwsch benchmarks')
+    parser.add_argument('--entities', type=int, default=10000, help='Количество сущностей для пакетных замеров')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 100, 10000, 100000],
+                        help='Количество отзывов на сущность для замеров по одной сущности')
+    parser.add_argument('--fleet-reviews', type=int, default=1000,
+                        help='Максимальное количество отзывов на сущность в пакетных замерах')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='Файл для записи результатов в JSON')
+    parser.add_argument('--compare', help='Файл с результатами предыдущего запуска для сравнения')
+    args = parser.parse_args(argv)
+
+    report = {
+        'meta': {
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'entities': args.entities,
+            'sizes': args.sizes,
+            'fleet_reviews': args.fleet_reviews,
+        },
+        'results': run_benchmarks(args.entities, args.sizes, args.seed, args.repeat, args.fleet_reviews),
+    }
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(report, fh, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fh:
+            compare(json.load(fh), report)
+    elif not args.output:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+from datetime import date
+from unittest import TestCase
+
+import numpy as np
+
+from benchmarks.generator import ACTIVITIES, generate_batch, generate_history
+from examples.serp import strategies
+from rwsch.models import SchedulingService
+
+
+class GeneratorTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.reference_date = date(2019, 6, 1)
+        cls.service = SchedulingService([
+            strategies.HighActivity,
+            strategies.MediumActivity,
+            strategies.PastActivity,
+            strategies.HighLowActivity,
+            strategies.LowLowActivity,
+        ], reference_date=cls.reference_date)
+
+    def test_activity_classes(self):
+        rng = np.random.default_rng(0)
+
+        activities = np.repeat(ACTIVITIES, 50)
+        n_reviews = np.tile([1, 10, 100, 1000, 30], len(activities) // 5)
+
+        batch = generate_batch(activities, n_reviews, rng, self.reference_date)
+
+        expected = [ACTIVITIES.index(a) if a != 'none' else -1 for a in activities]
+        self.assertEqual(self.service.get_strategies(batch).tolist(), expected)
+        self.assertTrue(np.all(np.diff(batch.offsets) >= n_reviews))
+
+    def test_seeded(self):
+        first = generate_history('high', 500, np.random.default_rng(1), self.reference_date)
+        second = generate_history('high', 500, np.random.default_rng(1), self.reference_date)
+
+        self.assertEqual(len(first), 500)
+        self.assertEqual(first.dates.tolist(), second.dates.tolist())
+        self.assertIsInstance(self.service.get_strategy(first), strategies.HighActivity)
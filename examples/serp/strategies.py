@@ -1,34 +1,53 @@
-import random
 from collections import deque
 from functools import reduce
-from random import randint
 
-from rwsch.models import SchedulingStrategy, Period
+import numpy as np
+
+from rwsch.models import SchedulingStrategy, ActivityThreshold
 
 DISTRIBUTION_SCHEMES = [
     ['growth', 'growth', 'rollback', 'growth'],
     ['growth', 'repeat', 'growth', 'rollback']
 ]
 
+ROLLBACK_FACTORS = [0.2, 0.3, 0.4]
+
+
+def _distribution_batch(schemes) -> np.ndarray:
+    """Матрица шагов (количество сущностей x 12) для выбранных схем распределения (количество сущностей x 3)"""
+
+    steps = np.array(DISTRIBUTION_SCHEMES)
+
+    return np.hstack([steps[schemes[:, i]] for i in range(0, schemes.shape[1])])
+
+
+def _last_year_averages(profile):
+    last_year = profile.window(0, 365)
+
+    return last_year.positive / 12, last_year.negative / 12
+
 
 class HighActivity(SchedulingStrategy):
     """Группа высокой активности"""
 
+    # Количество отзывов больше 2 в месяц (30 дней) за последний год
+    # Минимум 24 отзыва за последний год
+    thresholds = [ActivityThreshold(window=(0, 365), divisor=12, minimum=2)]
+
     def get_schedule(self, items):
         """
         Первый 2 месяца ср негатив в мес за год + 0.3 * ср позитив в мес за год
         Дальше увеличивается на 30% ежемесячно
         """
 
-        period = Period.from_delta(0, 365)
-
-        pos_items = list(i for i in items if (period.satisfied(i) and i.rating > 3))
-        avg_pos = len(pos_items) / 12
+        last_year = self._profile(items).window(0, 365)
 
-        neg_items = list(i for i in items if (period.satisfied(i) and i.rating < 4))
-        avg_neg = len(neg_items) / 12
+        avg_pos = last_year.positive / 12
+        avg_neg = last_year.negative / 12
 
-        distribution = reduce((lambda x, y: x + random.choice(DISTRIBUTION_SCHEMES)), range(0, 3), [])
+        distribution = reduce(
+            (lambda x, y: x + DISTRIBUTION_SCHEMES[self.rng.integers(0, len(DISTRIBUTION_SCHEMES))]), range(0, 3), []
+        )
 
         schedule = []
         for m in range(0, 12):
@@ -38,7 +57,7 @@ class HighActivity(SchedulingStrategy):
                 if distribution[m] == 'growth':
                     limit = schedule[-1] * 1.3
                 elif distribution[m] == 'rollback':
-                    limit = schedule[-1] * (1 - random.choice([0.2, 0.3, 0.4]))
+                    limit = schedule[-1] * (1 - ROLLBACK_FACTORS[self.rng.integers(0, len(ROLLBACK_FACTORS))])
                 else:
                     limit = schedule[-1]
 
@@ -46,39 +65,69 @@ class HighActivity(SchedulingStrategy):
 
         return [round(l) for l in schedule]
 
-    @classmethod
-    def satisfies(cls, items):
-        """
-        Количество отзывов больше 2 в месяц (30 дней) за последний год
-        Минимум 24 отзыва за последний год
-        """
-        period = Period.from_delta(0, 365)
+    def get_schedule_batch(self, avg_pos, avg_neg) -> np.ndarray:
+        """Расписания для множества сущностей сразу: avg_pos и avg_neg - массивы средних
+        количеств позитивных и негативных отзывов в месяц за последний год
+        (например, ReviewBatch.window(0, 365).positive / 12).
+        Строка i совпадает с get_schedule для i-й сущности при последовательных вызовах
+        с тем же генератором: каждая сущность берет из генератора 3 схемы, затем 3 коэффициента отката"""
+
+        avg_pos = np.asarray(avg_pos, dtype=np.float64)
+        avg_neg = np.asarray(avg_neg, dtype=np.float64)
+        n = len(avg_pos)
+
+        # В каждой схеме ровно один откат, поэтому количество случайных чисел на сущность постоянно
+        bounds = [len(DISTRIBUTION_SCHEMES)] * 3 + [len(ROLLBACK_FACTORS)] * 3
+        draws = self.rng.integers(0, bounds, size=(n, len(bounds)))
+
+        distribution = _distribution_batch(draws[:, :3])
+        rollbacks = 1 - np.array(ROLLBACK_FACTORS)[draws[:, 3:]]
+        rollback_idx = np.zeros(n, dtype=np.int64)
+
+        schedule = np.zeros((n, 12), dtype=np.float64)
+        schedule[:, 0] = schedule[:, 1] = avg_neg + (0.3 * avg_pos)
+
+        rows = np.arange(0, n)
+        for m in range(2, 12):
+            step = distribution[:, m]
+            growth = step == 'growth'
+            rollback = step == 'rollback'
 
-        items = list(i for i in items if period.satisfied(i))
+            schedule[:, m] = schedule[:, m - 1]
+            schedule[growth, m] = schedule[growth, m - 1] * 1.3
+            schedule[rollback, m] = schedule[rollback, m - 1] * rollbacks[rows[rollback], rollback_idx[rollback]]
 
-        avg = len(items) / 12
+            rollback_idx += rollback
 
-        return avg >= 2
+        return np.round(schedule).astype(np.int64)
+
+    def get_schedules(self, items, n_samples):
+        avg_pos, avg_neg = _last_year_averages(self._profile(items))
+
+        return self.get_schedule_batch(np.full(n_samples, avg_pos), np.full(n_samples, avg_neg))
 
 
 class MediumActivity(SchedulingStrategy):
     """Группа средней активности"""
 
+    # Количество отзывов больше 1 в 60 дней за последний год
+    # Минимум 6 отзывов за последний год
+    thresholds = [ActivityThreshold(window=(0, 365), divisor=6, minimum=1)]
+
     def get_schedule(self, items):
         """
         Первый месяц ср негатив в мес за год + 0.3 * ср позитив в мес за год
         Дальше увеличивается на 1 отзыв в месяц
         """
 
-        period = Period.from_delta(0, 365)
+        last_year = self._profile(items).window(0, 365)
 
-        pos_items = list(i for i in items if (period.satisfied(i) and i.rating > 3))
-        avg_pos = len(pos_items) / 12
+        avg_pos = last_year.positive / 12
+        avg_neg = last_year.negative / 12
 
-        neg_items = list(i for i in items if (period.satisfied(i) and i.rating < 4))
-        avg_neg = len(neg_items) / 12
-
-        distribution = reduce((lambda x, y: x + random.choice(DISTRIBUTION_SCHEMES)), range(0, 3), [])
+        distribution = reduce(
+            (lambda x, y: x + DISTRIBUTION_SCHEMES[self.rng.integers(0, len(DISTRIBUTION_SCHEMES))]), range(0, 3), []
+        )
 
         schedule = []
         for m in range(0, 12):
@@ -96,42 +145,57 @@ class MediumActivity(SchedulingStrategy):
 
         return [round(l) for l in schedule]
 
-    @classmethod
-    def satisfies(cls, items):
-        """
-        Количество отзывов больше 1 в 60 дней за последний год
-        Минимум 6 отзывов за последний год
-        """
+    def get_schedule_batch(self, avg_pos, avg_neg) -> np.ndarray:
+        """Расписания для множества сущностей сразу, см. HighActivity.get_schedule_batch.
+        Каждая сущность берет из генератора только 3 схемы распределения"""
 
-        period = Period.from_delta(0, 365)
+        avg_pos = np.asarray(avg_pos, dtype=np.float64)
+        avg_neg = np.asarray(avg_neg, dtype=np.float64)
+        n = len(avg_pos)
 
-        items = list(i for i in items if period.satisfied(i))
+        distribution = _distribution_batch(self.rng.integers(0, len(DISTRIBUTION_SCHEMES), size=(n, 3)))
 
-        avg = len(items) / 6
+        schedule = np.zeros((n, 12), dtype=np.float64)
+        schedule[:, 0] = avg_neg + (0.3 * avg_pos)
 
-        return avg >= 1
+        for m in range(1, 12):
+            step = distribution[:, m]
+            growth = step == 'growth'
+            rollback = step == 'rollback'
+
+            schedule[:, m] = schedule[:, m - 1]
+            schedule[growth, m] = schedule[growth, m - 1] + 1
+            schedule[rollback, m] = schedule[rollback, m - 2]
+
+        return np.round(schedule).astype(np.int64)
+
+    def get_schedules(self, items, n_samples):
+        avg_pos, avg_neg = _last_year_averages(self._profile(items))
+
+        return self.get_schedule_batch(np.full(n_samples, avg_pos), np.full(n_samples, avg_neg))
 
 
 class PastActivity(SchedulingStrategy):
     """Группа с активностью не в текущем году"""
 
+    # Количество отзывов больше 6 (1 отзыв раз в 2 месяца) в год за любой
+    # из последних 2 годов, предшествующих текущему
+    thresholds = [
+        ActivityThreshold(window=(365, 2 * 365), divisor=6, minimum=1),
+        ActivityThreshold(window=(2 * 365, 3 * 365), divisor=6, minimum=1),
+    ]
+
     def get_schedule(self, items):
-        periods = [
-            Period.from_delta(0, 365),
-            Period.from_delta(365, 2 * 365),
-            Period.from_delta(2 * 365, 3 * 365),
-        ]
+        years = self._profile(items).years
 
         hi_activity_avg_list = []
         lo_activity_avg_list = []
 
-        for period in periods:
-            period_items = [i for i in items if period.satisfied(i)]
-
-            if len(period_items) == 0:
+        for year in years:
+            if year.count == 0:
                 continue
 
-            avg = len(period_items) / 12
+            avg = year.count / 12
             if avg >= 0.5:
                 hi_activity_avg_list.append(avg)
             else:
@@ -159,32 +223,52 @@ class PastActivity(SchedulingStrategy):
 
         return schedule
 
-    @classmethod
-    def satisfies(cls, items):
-        """
-        Количество отзывов больше 6 (1 отзыв раз в 2 месяца) в год за любой
-        из последних 2 годов, предшествующих текущему
-        """
+    def get_schedule_batch(self, year_counts) -> np.ndarray:
+        """Расписания для множества сущностей сразу: year_counts - матрица (количество сущностей x 3)
+        количества отзывов за каждый из трех последних лет. Случайные числа не используются"""
+
+        averages = np.asarray(year_counts, dtype=np.float64).reshape(-1, 3) / 12
+        n = len(averages)
 
-        periods = [
-            Period.from_delta(365, 2 * 365),
-            Period.from_delta(2 * 365, 3 * 365),
-        ]
+        lo = (averages > 0) & (averages < 0.5)
+        lo_count = lo.sum(axis=1)
+        lo_sum = np.where(lo, averages, 0).sum(axis=1)
 
-        for period in periods:
-            period_items = [i for i in items if period.satisfied(i)]
+        lo_activity_avg = np.full(n, 0.083)
+        lo_activity_avg[lo_count > 0] = lo_sum[lo_count > 0] / lo_count[lo_count > 0]
 
-            avg = len(period_items) / 6
+        year_plan = np.round(lo_activity_avg * 1.5 * 12).astype(np.int64)
 
-            if avg >= 1:
-                return True
+        # Шаг публикаций считается так же, как в get_schedule, для каждого из немногих различных планов
+        plans, plan_idx = np.unique(year_plan, return_inverse=True)
+        steps = np.array([int(round(12 / int(plan), 1) * 10) for plan in plans], dtype=np.int64)[plan_idx]
+        planned = np.array([len(range(0, 120, step)) for step in steps], dtype=np.int64)
 
-        return False
+        schedule = np.zeros((n, 12), dtype=np.int64)
+        published = np.zeros(n, dtype=np.int64)
+
+        for m in range(0, 12):
+            # Очередь публикаций: публикация выходит, если ее срок наступил к месяцу m
+            due = np.minimum(10 * m // steps + 1, planned)
+
+            schedule[:, m] = due > published
+            published += schedule[:, m]
+
+        return schedule
+
+    def get_schedules(self, items, n_samples):
+        counts = [year.count for year in self._profile(items).years]
+
+        return self.get_schedule_batch(np.tile(counts, (n_samples, 1)))
 
 
 class HighLowActivity(SchedulingStrategy):
     """Группа с низкой активностью 3-6 отзывов в год"""
 
+    # Количество отзывов больше 3 в год (365) за последниие 3 года (1095 дней)
+    # Минимум 9 отзывов за последние три года
+    thresholds = [ActivityThreshold(window=(0, 3 * 365), divisor=3, minimum=3)]
+
     def get_schedule(self, items):
         """
         2 отзыва в год, в первом и во втором полугодии случайным образом
@@ -192,33 +276,38 @@ class HighLowActivity(SchedulingStrategy):
 
         schedule = [0 for _ in range(0, 12)]
 
-        rnd_month = randint(0, 5)
+        rnd_month = self.rng.integers(0, 6)
         schedule[rnd_month] = 1
 
-        rnd_month = randint(6, 11)
+        rnd_month = self.rng.integers(6, 12)
         schedule[rnd_month] = 1
 
         return schedule
 
-    @classmethod
-    def satisfies(cls, items):
-        """
-        Количество отзывов больше 3 в год (365) за последниие 3 года (1095 дней)
-        Минимум 9 отзывов за последние три года
-        """
+    def get_schedule_batch(self, n_entities) -> np.ndarray:
+        """Расписания для n_entities сущностей сразу. Строка i совпадает с get_schedule
+        для i-й сущности при последовательных вызовах с тем же генератором"""
 
-        period = Period.from_delta(0, 3 * 365)
+        schedules = np.zeros((n_entities, 12), dtype=np.int64)
+        rows = np.arange(0, n_entities)
 
-        items = list(i for i in items if period.satisfied(i))
+        months = self.rng.integers([0, 6], [6, 12], size=(n_entities, 2))
+        schedules[rows, months[:, 0]] = 1
+        schedules[rows, months[:, 1]] = 1
 
-        avg = len(items) / 3
+        return schedules
 
-        return avg >= 3
+    def get_schedules(self, items, n_samples):
+        return self.get_schedule_batch(n_samples)
 
 
 class LowLowActivity(SchedulingStrategy):
     """Группа с низкой активностью 1-2 отзыва в год"""
 
+    # Количество отзывов больше 1 в год (365) за последниие 3 года (1095 дней)
+    # Минимум 3 отзыва за последние три года
+    thresholds = [ActivityThreshold(window=(0, 3 * 365), divisor=3, minimum=1)]
+
     def get_schedule(self, items):
         """
         1 отзыв в год, в первом и во втором полугодии случайным образом
@@ -226,22 +315,18 @@ class LowLowActivity(SchedulingStrategy):
 
         schedule = [0 for _ in range(0, 12)]
 
-        rnd_month = randint(0, 11)
+        rnd_month = self.rng.integers(0, 12)
         schedule[rnd_month] = 1
 
         return schedule
 
-    @classmethod
-    def satisfies(cls, items):
-        """
-        Количество отзывов больше 1 в год (365) за последниие 3 года (1095 дней)
-        Минимум 3 отзыва за последние три года
-        """
-
-        period = Period.from_delta(0, 3 * 365)
+    def get_schedule_batch(self, n_entities) -> np.ndarray:
+        """Расписания для n_entities сущностей сразу, см. HighLowActivity.get_schedule_batch"""
 
-        items = list(i for i in items if period.satisfied(i))
+        schedules = np.zeros((n_entities, 12), dtype=np.int64)
+        schedules[np.arange(0, n_entities), self.rng.integers(0, 12, n_entities)] = 1
 
-        avg = len(items) / 3
+        return schedules
 
-        return avg >= 1
+    def get_schedules(self, items, n_samples):
+        return self.get_schedule_batch(n_samples)
@@ -1,7 +1,10 @@
-from datetime import datetime
+from datetime import datetime, date, timedelta
 from unittest import TestCase
 
+import numpy as np
+
 from examples.serp import strategies
+from rwsch.history import ReviewBatch
 from rwsch.models import SchedulingService
 
 
@@ -22,7 +25,7 @@ class StrategiesTestCase(TestCase):
             strategies.LowLowActivity
         ]
 
-        service = SchedulingService(strategy_list)
+        service = SchedulingService(strategy_list, reference_date=date(2019, 6, 1))
 
         cls.service = service
 
@@ -127,3 +130,77 @@ class StrategiesTestCase(TestCase):
 
         sch = group.get_schedule(items)
         self.assertEqual(sum(sch), 1)
+
+    def test_batch_classification(self):
+        # Окна зависят от даты расчета, поэтому она закреплена в самом тесте, а не берется по текущей дате
+        reference_date = date(2019, 6, 1)
+        service = SchedulingService(self.service._strategy_list, reference_date=reference_date)
+
+        # Отзывы задаются возрастом в днях относительно даты расчета
+        def make_items(counts):
+            items = []
+            for age, count in counts:
+                items += [TestItem(reference_date - timedelta(days=age), 4) for _ in range(0, count)]
+            return items
+
+        histories = [
+            make_items([(151, 24)]),
+            make_items([(151, 12)]),
+            make_items([(151, 4), (516, 6)]),
+            make_items([(151, 3), (516, 3), (881, 3)]),
+            make_items([(151, 1), (516, 1), (881, 1)]),
+            [],
+        ]
+
+        indices = service.get_strategies(ReviewBatch.from_histories(histories, today=reference_date))
+
+        self.assertEqual(list(indices), [0, 1, 2, 3, 4, -1])
+        self.assertEqual(list(service.get_strategies(histories)), list(indices))
+
+        for history, idx in zip(histories, indices):
+            strategy = service.get_strategy(history)
+
+            if idx < 0:
+                self.assertIsNone(strategy)
+            else:
+                self.assertIsInstance(strategy, service._strategy_list[idx])
+                self.assertEqual(strategy.reference_date, reference_date)
+
+    def test_batch_schedules_match_single(self):
+        reference_date = date(2019, 6, 1)
+        rng = np.random.default_rng(0)
+
+        histories = [
+            [TestItem(reference_date - timedelta(days=int(d)), int(r))
+             for d, r in zip(rng.integers(1, 1095, size=n), rng.integers(1, 6, size=n))]
+            for n in rng.integers(10, 400, size=50)
+        ]
+
+        batch = ReviewBatch.from_histories(histories, today=reference_date)
+        last_year = batch.window(0, 365)
+
+        # Стратегия прошлой активности рассчитана на истории, где хотя бы в одном году не меньше 6 отзывов
+        past_counts = rng.integers(0, 9, size=(50, 3))
+        past_counts[:, 1] = np.maximum(past_counts[:, 1], 6)
+        past_histories = [
+            [TestItem(reference_date - timedelta(days=180 + y * 365), 4) for y in range(0, 3) for _ in range(0, c[y])]
+            for c in past_counts
+        ]
+
+        inputs = {
+            strategies.HighActivity: (histories, last_year.positive / 12, last_year.negative / 12),
+            strategies.MediumActivity: (histories, last_year.positive / 12, last_year.negative / 12),
+            strategies.PastActivity: (past_histories, past_counts),
+            strategies.HighLowActivity: (histories, len(histories)),
+            strategies.LowLowActivity: (histories, len(histories)),
+        }
+
+        for strategy_cls, (histories, *args) in inputs.items():
+            single = strategy_cls(rng=np.random.default_rng(7), reference_date=reference_date)
+            expected = [single.get_schedule(items) for items in histories]
+
+            strategy = strategy_cls(rng=np.random.default_rng(7), reference_date=reference_date)
+            schedules = strategy.get_schedule_batch(*args)
+
+            self.assertEqual(schedules.shape, (len(histories), 12))
+            self.assertEqual(schedules.tolist(), expected)
@@ -0,0 +1,196 @@
+import asyncio
+from concurrent.futures import Executor
+
+import numpy as np
+
+from rwsch.history import ReviewBatch, ReviewHistory, as_activity
+from rwsch.models import SchedulingService, ForecastLimitItem
+
+_STRATEGY = 'strategy'
+_FORECAST = 'forecast'
+
+
+def _attempt(func, *args, **kwargs):
+    """Пара (успех, результат или исключение) для вызова func"""
+
+    try:
+        return True, func(*args, **kwargs)
+    except Exception as e:
+        return False, e
+
+
+def _forecast(service: SchedulingService, items, limit_item: ForecastLimitItem, limit_value, rng):
+    strategy = service.get_strategy(items, rng=rng)
+
+    return None if strategy is None else strategy.get_forecast(items, limit_item, limit_value)
+
+
+def _run_batch(service: SchedulingService, requests):
+    """Обработка пакета запросов в executor. Для каждого запроса возвращается пара
+    (успех, результат или исключение), чтобы ошибка одного запроса не затрагивала остальные.
+    Отзывы приводятся к истории здесь же, а не в цикле событий"""
+
+    results = [None] * len(requests)
+    reference_date = service._get_reference_date()
+
+    # Истории классифицируются одним вызовом get_strategies. Готовые профили
+    # (накопители, профили хранилища) в пакет не собираются и обрабатываются по одному
+    histories = []
+    for i, (kind, args) in enumerate(requests):
+        if kind != _STRATEGY:
+            continue
+
+        items, rng = args
+
+        ok, activity = _attempt(as_activity, items)
+        if not ok:
+            results[i] = (False, activity)
+        elif isinstance(activity, ReviewHistory):
+            histories.append((i, activity))
+        else:
+            results[i] = _attempt(service.get_strategy, activity, rng=rng)
+
+    if histories:
+        batch = ReviewBatch.from_histories([history for _, history in histories], today=reference_date)
+        ok, indices = _attempt(service.get_strategies, batch)
+
+        for n, (i, history) in enumerate(histories):
+            rng = requests[i][1][1]
+
+            if not ok:
+                # Ошибка пакета не должна затронуть все запросы: каждый пересчитывается отдельно
+                results[i] = _attempt(service.get_strategy, history, rng=rng)
+                continue
+
+            strategy = None
+            if indices[n] >= 0:
+                strategy = service._strategy_list[indices[n]](rng=rng, reference_date=reference_date, sink=service.sink)
+
+            results[i] = (True, strategy)
+
+    for i, (kind, args) in enumerate(requests):
+        if kind == _FORECAST:
+            results[i] = _attempt(_forecast, service, *args)
+
+    return results
+
+
+class AsyncSchedulingService:
+    """Асинхронный фронтенд к SchedulingService.
+    Запросы складываются в очередь, запросы, пришедшие в пределах max_latency секунд,
+    объединяются в пакет не больше max_batch_size и обрабатываются в executor,
+    не блокируя цикл событий. Очередь ограничена max_pending запросами:
+    при ее заполнении вызывающие ждут освобождения места"""
+
+    def __init__(self, service: SchedulingService, max_batch_size: int = 64, max_latency: float = 0.005,
+                 max_pending: int = 1024, executor: Executor = None):
+        assert max_batch_size > 0, 'Размер пакета должен быть положительным'
+
+        self._service = service
+        self._max_batch_size = max_batch_size
+        self._max_latency = max_latency
+        self._max_pending = max_pending
+        self._executor = executor
+
+        self._queue = None
+        self._worker = None
+        # Пакет, который сейчас обрабатывается в executor
+        self._current = []
+
+    async def start(self):
+        if self._worker is None:
+            self._queue = asyncio.Queue(maxsize=self._max_pending)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        """Остановка обработчика. Ожидающие запросы - из очереди и из пакета,
+        который обрабатывался в момент закрытия, - отменяются"""
+
+        if self._worker is not None:
+            self._worker.cancel()
+
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+            pending = [future for _, _, future in self._current]
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait()[2])
+
+            for future in pending:
+                future.cancel()
+
+            self._worker = None
+            self._queue = None
+            self._current = []
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _submit(self, kind, args):
+        await self.start()
+
+        queue = self._queue
+        future = asyncio.get_running_loop().create_future()
+        await queue.put((kind, args, future))
+
+        # Сервис закрыли, пока запрос ждал места в очереди: обработать его уже некому
+        if self._queue is not queue:
+            future.cancel()
+
+        return await future
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+
+        # Пакет собирается сразу в self._current, чтобы при закрытии
+        # уже взятые из очереди запросы не потерялись
+        batch = self._current = [await self._queue.get()]
+        deadline = loop.time() + self._max_latency
+
+        while len(batch) < self._max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self._next_batch()
+
+            requests = [(kind, args) for kind, args, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, _run_batch, self._service, requests)
+            except Exception as e:
+                results = [(False, e)] * len(batch)
+
+            for (_, _, future), (ok, value) in zip(batch, results):
+                if future.done():
+                    continue
+
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+            self._current = []
+
+    async def get_strategy(self, items, rng: np.random.Generator = None):
+        return await self._submit(_STRATEGY, (items, rng))
+
+    async def get_forecast(self, items, limit_item: ForecastLimitItem, limit_value, rng: np.random.Generator = None):
+        """Прогноз стратегии, выбранной для сущности. Если ни одна стратегия не подошла, возвращается None"""
+        return await self._submit(_FORECAST, (items, limit_item, limit_value, rng))
@@ -0,0 +1,227 @@
+import hashlib
+import pickle
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import numpy as np
+
+from rwsch.history import as_activity, ActivityProfile
+from rwsch.models import SchedulingService, ForecastLimitItem
+
+_MISSING = object()
+
+
+def history_fingerprint(profile: ActivityProfile):
+    """Дешевый отпечаток истории: количество отзывов, дата последнего отзыва и сумма оценок"""
+
+    last_date = profile.last_date.isoformat() if profile.last_date is not None else None
+
+    return profile.total.count, last_date, profile.total.rating_sum
+
+
+class BaseCache(ABC):
+    """Общая часть кешей: параметры вытеснения, проверка времени жизни и счетчики обращений.
+    Записи вытесняются, если давно не использовались (LRU) или прожили дольше ttl секунд"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None, clock=time.time):
+        assert maxsize > 0, 'Размер кеша должен быть положительным'
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+
+        self.hits = 0
+        self.misses = 0
+
+    def _expired(self, created) -> bool:
+        return self.ttl is not None and self._clock() - created > self.ttl
+
+    def get(self, key, default=None):
+        value = self.peek(key, _MISSING)
+
+        if value is _MISSING:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+
+        return value
+
+    @abstractmethod
+    def peek(self, key, default=None):
+        """Значение записи без учета в счетчиках hits и misses. Как и get, отмечает запись использованной"""
+
+    @abstractmethod
+    def set(self, key, value):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def __len__(self):
+        pass
+
+
+class MemoryCache(BaseCache):
+    """Кеш в памяти"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None, clock=time.time):
+        super().__init__(maxsize=maxsize, ttl=ttl, clock=clock)
+
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def peek(self, key, default=None):
+        entry = self._entries.get(key, _MISSING)
+
+        if entry is not _MISSING and self._expired(entry[0]):
+            del self._entries[key]
+            entry = _MISSING
+
+        if entry is _MISSING:
+            return default
+
+        self._entries.move_to_end(key)
+
+        return entry[1]
+
+    def set(self, key, value):
+        self._entries[key] = (self._clock(), value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле SQLite с теми же правилами вытеснения, что и MemoryCache.
+    Записи переживают перезапуск процесса, значения сериализуются через pickle"""
+
+    # Порядок использования записей хранится счетчиком, а не временем, чтобы не зависеть от разрешения часов
+    _TOUCH = 'UPDATE cache SET accessed = (SELECT MAX(accessed) FROM cache) + 1 WHERE key = ?'
+
+    def __init__(self, path, maxsize: int = 1024, ttl: float = None, clock=time.time):
+        super().__init__(maxsize=maxsize, ttl=ttl, clock=clock)
+
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, created REAL NOT NULL, accessed INTEGER NOT NULL)'
+            )
+            # По индексу считаются MAX(accessed) в _TOUCH и порядок вытеснения
+            self._connection.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+
+    def __len__(self):
+        return self._connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def peek(self, key, default=None):
+        row = self._connection.execute('SELECT value, created FROM cache WHERE key = ?', (key,)).fetchone()
+
+        if row is not None and self._expired(row[1]):
+            with self._connection:
+                self._connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+            row = None
+
+        if row is None:
+            return default
+
+        with self._connection:
+            self._connection.execute(self._TOUCH, (key,))
+
+        return pickle.loads(row[0])
+
+    def set(self, key, value):
+        with self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO cache (key, value, created, accessed) VALUES (?, ?, ?, 0)',
+                (key, pickle.dumps(value), self._clock()),
+            )
+            self._connection.execute(self._TOUCH, (key,))
+            self._connection.execute(
+                'DELETE FROM cache WHERE key IN '
+                '(SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+                (self.maxsize,),
+            )
+
+    def clear(self):
+        with self._connection:
+            self._connection.execute('DELETE FROM cache')
+
+    def close(self):
+        self._connection.close()
+
+
+class CachingSchedulingService:
+    """Кеширующая обертка над SchedulingService для выбора стратегии и прогноза.
+    Ключ записи включает отпечаток истории, дату расчета, параметры ограничения
+    прогноза и seed генератора случайных чисел, поэтому закешированный прогноз
+    совпадает с тем, что вернул бы повторный расчет"""
+
+    def __init__(self, service: SchedulingService, cache: BaseCache = None):
+        self._service = service
+        self.cache = cache if cache is not None else MemoryCache()
+
+        strategies = ','.join('%s.%s' % (s.__module__, s.__qualname__) for s in service._strategy_list)
+        self._strategies_key = hashlib.sha1(strategies.encode('utf-8')).hexdigest()
+
+    def _key(self, *parts) -> str:
+        return hashlib.sha1(repr((self._strategies_key,) + parts).encode('utf-8')).hexdigest()
+
+    def _prepare(self, items):
+        reference_date = self._service._get_reference_date()
+
+        items = as_activity(items)
+        fingerprint = history_fingerprint(items.profile(reference_date))
+
+        return items, reference_date, fingerprint
+
+    def _strategy(self, items, reference_date, fingerprint, seed, lookup):
+        key = self._key('strategy', fingerprint, reference_date.isoformat())
+        strategy_idx = lookup(key)
+
+        if strategy_idx is None:
+            strategy = self._service.get_strategy(items)
+
+            strategy_idx = -1 if strategy is None else self._service._strategy_list.index(type(strategy))
+            self.cache.set(key, strategy_idx)
+
+        if strategy_idx < 0:
+            return None
+
+        strategy_cls = self._service._strategy_list[strategy_idx]
+
+        return strategy_cls(rng=np.random.default_rng(seed), reference_date=reference_date)
+
+    def get_strategy(self, items, seed: int = 0):
+        items, reference_date, fingerprint = self._prepare(items)
+
+        return self._strategy(items, reference_date, fingerprint, seed, self.cache.get)
+
+    def get_forecast(self, items, limit_item: ForecastLimitItem, limit_value, seed: int = 0):
+        """Прогноз стратегии, выбранной для сущности, с генератором из seed.
+        Если ни одна стратегия не подошла, возвращается None.
+        В hits и misses учитывается только запись прогноза: стратегия
+        при его пересчете берется из кеша без учета в счетчиках"""
+
+        items, reference_date, fingerprint = self._prepare(items)
+
+        key = self._key('forecast', fingerprint, reference_date.isoformat(), limit_item.name, limit_value, seed)
+        forecast = self.cache.get(key, _MISSING)
+
+        if forecast is _MISSING:
+            strategy = self._strategy(items, reference_date, fingerprint, seed, self.cache.peek)
+
+            forecast = None if strategy is None else strategy.get_forecast(items, limit_item, limit_value)
+            self.cache.set(key, forecast)
+
+        return forecast
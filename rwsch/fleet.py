@@ -0,0 +1,166 @@
+import hashlib
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Type, List
+
+import numpy as np
+
+from rwsch.history import as_history
+from rwsch.models import SchedulingStrategy, SchedulingService, ForecastLimitItem
+
+# error - исключение, с которым завершился расчет сущности (strategy и forecast тогда None)
+FleetResult = namedtuple('FleetResult', ['entity_id', 'strategy', 'forecast', 'error'], defaults=(None,))
+
+# demand и allocation - матрицы (количество сущностей x месяцы), priority - отставание от целевой оценки
+FleetAllocation = namedtuple('FleetAllocation', ['entity_ids', 'demand', 'allocation', 'priority'])
+
+
+def entity_rng(seed: int, entity_id) -> np.random.Generator:
+    """Генератор случайных чисел сущности, зависящий только от seed и идентификатора сущности.
+    Идентификатор приводится к строке, поэтому 42 и '42' дают одинаковый генератор"""
+
+    digest = hashlib.blake2b(str(entity_id).encode('utf-8'), digest_size=8).digest()
+
+    return np.random.default_rng([seed, int.from_bytes(digest, 'little')])
+
+
+def _forecast_chunk(strategy_list, seed, reference_date, limit_item, limit_value, chunk):
+    service = SchedulingService(strategy_list, reference_date=reference_date)
+
+    results = []
+    for entity_id, history in chunk:
+        # Ошибка одной сущности возвращается в ее результате и не прерывает расчет остальных
+        try:
+            strategy = service.get_strategy(history, rng=entity_rng(seed, entity_id))
+
+            if strategy is None:
+                result = FleetResult(entity_id, None, None)
+            else:
+                forecast = strategy.get_forecast(history, limit_item, limit_value)
+                result = FleetResult(entity_id, type(strategy), forecast)
+        except Exception as e:
+            result = FleetResult(entity_id, None, None, e)
+
+        results.append(result)
+
+    return results
+
+
+class FleetRunner:
+    """Прогноз для множества сущностей на пуле процессов.
+    Сущности разбиваются на пакеты по chunk_size и раздаются воркерам,
+    результаты возвращаются потоком в исходном порядке.
+    Так как у каждой сущности свой генератор случайных чисел, результат
+    не зависит ни от количества воркеров, ни от размера пакета.
+    Дата расчета окон определяется один раз на запуск и общая для всех сущностей"""
+
+    def __init__(self, strategy_list: List[Type[SchedulingStrategy]], seed: int = 0,
+                 workers: int = None, chunk_size: int = 256, reference_date=None):
+        assert chunk_size > 0, 'Размер пакета должен быть положительным'
+
+        self._strategy_list = strategy_list
+        self._seed = seed
+        self._reference_date = reference_date
+        self._workers = workers
+        self._chunk_size = chunk_size
+
+    def _chunks(self, entities):
+        entities = iter(entities)
+
+        while True:
+            chunk = [(entity_id, as_history(items)) for entity_id, items in islice(entities, self._chunk_size)]
+
+            if not chunk:
+                break
+
+            yield chunk
+
+    def run(self, entities, limit_item: ForecastLimitItem = ForecastLimitItem.PERIOD, limit_value=12):
+        """Принимает итерируемый набор пар (идентификатор сущности, отзывы)
+        и возвращает генератор FleetResult в том же порядке"""
+
+        reference_date = self._reference_date if self._reference_date is not None else datetime.now().date()
+
+        args = (self._strategy_list, self._seed, reference_date, limit_item, limit_value)
+
+        if self._workers is not None and self._workers <= 1:
+            for chunk in self._chunks(entities):
+                yield from _forecast_chunk(*args, chunk)
+
+            return
+
+        workers = self._workers or os.cpu_count() or 1
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Ограничиваем количество пакетов в работе, чтобы не читать весь поток сущностей в память
+            max_pending = 2 * workers
+            pending = deque()
+
+            for chunk in self._chunks(entities):
+                pending.append(executor.submit(_forecast_chunk, *args, chunk))
+
+                if len(pending) >= max_pending:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
+
+
+def allocate_capacity(demand, capacity, priority) -> np.ndarray:
+    """Распределение общей емкости постинга между сущностями по месяцам.
+    demand - потребность сущностей (количество сущностей x месяцы), capacity - емкость
+    на каждый месяц (число или массив по месяцам), priority - приоритет сущностей.
+    Внутри месяца сущности обслуживаются по убыванию приоритета (при равенстве - в исходном порядке):
+    каждая получает свою потребность целиком, пока емкость не исчерпана,
+    последняя обслуженная сущность может получить потребность частично"""
+
+    demand = np.asarray(demand, dtype=np.int64)
+    assert demand.ndim == 2, 'Потребность задается матрицей (сущности x месяцы)'
+    assert np.all(demand >= 0), 'Потребность не может быть отрицательной'
+
+    capacity = np.broadcast_to(np.asarray(capacity, dtype=np.int64), (demand.shape[1],))
+    assert np.all(capacity >= 0), 'Емкость не может быть отрицательной'
+
+    order = np.argsort(-np.asarray(priority, dtype=np.float64), kind='stable')
+
+    # Для каждого месяца потребность сущностей, обслуженных раньше, - накопленная сумма в порядке приоритета
+    ordered = demand[order]
+    served_before = np.cumsum(ordered, axis=0) - ordered
+
+    allocation = np.empty_like(demand)
+    allocation[order] = np.clip(capacity - served_before, 0, ordered)
+
+    return allocation
+
+
+def allocate_fleet(results, capacity, target=5, months: int = 12) -> FleetAllocation:
+    """Распределение емкости по результатам FleetRunner.run.
+    Потребность сущности - расписание стратегии из прогноза (items_from_sch), приоритет -
+    отставание прогнозной оценки в последнем месяце прогноза от целевой target.
+    Сущности без стратегии и сущности, расчет которых завершился ошибкой, ничего не требуют"""
+
+    entity_ids = []
+    demand = []
+    priority = []
+
+    for result in results:
+        entity_ids.append(result.entity_id)
+
+        forecast = result.forecast or []
+        schedule = [row['items_from_sch'] for row in forecast[:months]]
+        demand.append(schedule + [0] * (months - len(schedule)))
+
+        priority.append(target - forecast[-1]['rating_avg'] if forecast else -np.inf)
+
+    demand = np.array(demand, dtype=np.int64).reshape(len(entity_ids), months)
+    priority = np.array(priority, dtype=np.float64)
+
+    return FleetAllocation(
+        entity_ids=entity_ids,
+        demand=demand,
+        allocation=allocate_capacity(demand, capacity, priority),
+        priority=priority,
+    )
@@ -0,0 +1,445 @@
+import copy
+from collections import namedtuple
+from datetime import datetime, date
+from typing import NamedTuple, Union
+
+try:
+    from typing import Protocol
+except ImportError:  # Python < 3.8
+    Protocol = object
+
+import numpy as np
+
+# Отзыв считается позитивным, если его оценка выше 3, и негативным, если ниже 4
+POSITIVE_RATING_ABOVE = 3
+NEGATIVE_RATING_BELOW = 4
+
+
+class ReviewItem(Protocol):
+    """Протокол отзыва, который принимает библиотека: любой объект с датой и оценкой"""
+
+    date: date
+    rating: Union[int, float]
+
+
+class Review(NamedTuple):
+    """Компактная запись отзыва без __dict__. Для таких записей Period.satisfied
+    не проверяет наличие атрибутов, а ReviewHistory выдает их при итерации"""
+
+    date: date
+    rating: Union[int, float] = 0
+
+
+# Агрегаты отзывов за окно: количество, сумма оценок, позитивные и негативные отзывы
+WindowStats = namedtuple('WindowStats', ['count', 'rating_sum', 'positive', 'negative'])
+
+
+# Порядковый номер дня 1970-01-01, от которого отсчитываются дни в datetime64[D]
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _date_array(dates) -> np.ndarray:
+    """Массив datetime64[D] из массива или последовательности дат.
+    Объекты date переводятся в номера дней через toordinal, что намного быстрее
+    поэлементного преобразования numpy"""
+
+    if isinstance(dates, np.ndarray):
+        return dates.astype('datetime64[D]', copy=False)
+
+    try:
+        days = np.fromiter((d.toordinal() for d in dates), dtype=np.int64, count=len(dates))
+    except AttributeError:
+        # Строки и другие представления дат, которые понимает numpy
+        return np.asarray(dates, dtype='datetime64[D]')
+
+    return (days - EPOCH_ORDINAL).view('datetime64[D]')
+
+
+def _compact_ratings(ratings) -> np.ndarray:
+    """Оценки хранятся в int8, если все они целые, иначе во float64"""
+
+    ratings = np.asarray(ratings, dtype=np.float64)
+
+    # Оценка помещается в int8 без потерь, только если обратно приводится к тому же значению
+    with np.errstate(invalid='ignore'):
+        compact = ratings.astype(np.int8)
+
+    if ratings.size and (compact == ratings).all():
+        return compact
+
+    return ratings
+
+
+class ReviewHistory:
+    """Колоночное хранилище истории отзывов.
+    Даты хранятся в массиве datetime64[D], оценки - в компактном числовом массиве,
+    что позволяет считать выборки по периодам векторно, без обхода объектов отзывов.
+    Отзывы упорядочиваются по дате, поэтому агрегаты любого периода считаются
+    бинарным поиском по префиксным суммам за O(log n)"""
+
+    def __init__(self, dates, ratings):
+        dates = _date_array(dates)
+        ratings = _compact_ratings(ratings)
+
+        assert dates.shape == ratings.shape, 'Количество дат и оценок должно совпадать'
+
+        # Перестановка, которой отзывы упорядочены по дате, или None, если они уже были упорядочены
+        order = None
+        if dates.size > 1 and np.any(dates[1:] < dates[:-1]):
+            order = np.argsort(dates, kind='stable')
+            dates = dates[order]
+            ratings = ratings[order]
+
+        self.dates = dates
+        self.ratings = ratings
+
+        self._order = order
+
+        self._prefix = None
+        self._profile = None
+
+    @classmethod
+    def from_items(cls, items):
+        """Построение истории из любого итерируемого набора объектов с атрибутами date и rating (см. ReviewItem)"""
+
+        if not isinstance(items, (list, tuple)):
+            items = list(items)
+
+        n = len(items)
+        days = np.fromiter((item.date.toordinal() for item in items), dtype=np.int64, count=n)
+        ratings = np.fromiter((item.rating for item in items), dtype=np.float64, count=n)
+
+        return cls((days - EPOCH_ORDINAL).view('datetime64[D]'), ratings)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __iter__(self):
+        for day, rating in zip(self.dates.tolist(), self.ratings.tolist()):
+            yield Review(day, rating)
+
+    def mask(self, period) -> np.ndarray:
+        """Булева маска отзывов, попадающих в период (границы периода не включаются).
+        Маска соответствует исходному порядку отзывов, из которых построена история"""
+
+        start = np.datetime64(period.start, 'D')
+        end = np.datetime64(period.end, 'D')
+
+        mask = (self.dates < start) & (self.dates > end)
+
+        if self._order is not None:
+            unsorted = np.empty_like(mask)
+            unsorted[self._order] = mask
+            mask = unsorted
+
+        return mask
+
+    def select(self, period=None) -> 'ReviewHistory':
+        if period is None:
+            return self
+
+        lo, hi = self._bounds(period)
+
+        return ReviewHistory(self.dates[lo:hi], self.ratings[lo:hi])
+
+    def _bounds(self, period):
+        """Границы среза отзывов, попадающих в период, в отсортированном массиве дат"""
+
+        lo = int(np.searchsorted(self.dates, np.datetime64(period.end, 'D'), side='right'))
+        hi = int(np.searchsorted(self.dates, np.datetime64(period.start, 'D'), side='left'))
+
+        return lo, max(lo, hi)
+
+    def _prefix_sums(self):
+        if self._prefix is None:
+            ratings = self.ratings
+            cum_dtype = np.float64 if ratings.dtype.kind == 'f' else np.int64
+
+            # Суммы оценок, позитивных и негативных отзывов пишутся в одну матрицу без промежуточных массивов
+            prefix = np.zeros((3, len(ratings) + 1), dtype=cum_dtype)
+            np.cumsum(ratings, dtype=cum_dtype, out=prefix[0, 1:])
+            np.cumsum(ratings > POSITIVE_RATING_ABOVE, dtype=cum_dtype, out=prefix[1, 1:])
+            np.cumsum(ratings < NEGATIVE_RATING_BELOW, dtype=cum_dtype, out=prefix[2, 1:])
+
+            self._prefix = (prefix[0], prefix[1], prefix[2])
+
+        return self._prefix
+
+    def stats(self, period=None) -> WindowStats:
+        """Количество, сумма оценок и разбивка на позитив/негатив за период за O(log n)"""
+
+        if period is None:
+            lo, hi = 0, len(self)
+        else:
+            lo, hi = self._bounds(period)
+
+        rating_sum, positive, negative = self._prefix_sums()
+
+        return WindowStats(
+            count=hi - lo,
+            rating_sum=(rating_sum[hi] - rating_sum[lo]).item(),
+            positive=int(positive[hi] - positive[lo]),
+            negative=int(negative[hi] - negative[lo]),
+        )
+
+    def count(self, period=None) -> int:
+        if period is None:
+            return len(self)
+
+        lo, hi = self._bounds(period)
+
+        return hi - lo
+
+    def rating_sum(self, period=None):
+        return self.stats(period).rating_sum
+
+    def positive_count(self, period=None) -> int:
+        return self.stats(period).positive
+
+    def negative_count(self, period=None) -> int:
+        return self.stats(period).negative
+
+    def profile(self, today=None) -> 'ActivityProfile':
+        """Профиль активности на дату today (по умолчанию - на текущую).
+        Строится один раз и переиспользуется, пока дата не изменится"""
+
+        if today is None:
+            today = datetime.now().date()
+
+        if self._profile is None or self._profile.today != today:
+            self._profile = ActivityProfile.build(self, today)
+
+        return self._profile
+
+
+class ActivityProfile:
+    """Профиль активности сущности на конкретную дату.
+    Хранит агрегаты отзывов по возрасту в днях на глубину DEPTH_DAYS,
+    агрегаты любого окна внутри этой глубины считаются через префиксные суммы
+    без повторного обхода истории. Для ReviewHistory профиль строится методом build (см. HistoryProfile)"""
+
+    DEPTH_DAYS = 3 * 365
+
+    def __init__(self, today, count, rating_sum, positive, negative, total: WindowStats, last_date=None):
+        self.today = today
+        self.total = total
+        # Дата самого позднего отзыва во всей истории
+        self.last_date = last_date
+
+        # Префиксные суммы по возрасту отзыва: элемент k - сумма по возрастам [0, k)
+        self._count = np.concatenate(([0], np.cumsum(count)))
+        self._rating_sum = np.concatenate(([0], np.cumsum(rating_sum)))
+        self._positive = np.concatenate(([0], np.cumsum(positive)))
+        self._negative = np.concatenate(([0], np.cumsum(negative)))
+
+    @classmethod
+    def build(cls, history: ReviewHistory, today) -> 'ActivityProfile':
+        return HistoryProfile(history, today)
+
+    def window(self, start=0, end=0) -> WindowStats:
+        """Агрегаты за окно, заданное так же, как в Period.from_delta:
+        учитываются отзывы с возрастом строго больше start и строго меньше end дней"""
+
+        assert start < end, 'Дельта окончания должна быть больше дельты начала'
+        assert end <= self.DEPTH_DAYS, 'Окно выходит за глубину профиля'
+
+        return self._range(start + 1, end)
+
+    def _range(self, lo, hi) -> WindowStats:
+        """Агрегаты по возрастам [lo, hi)"""
+
+        if hi <= lo:
+            return WindowStats(0, 0, 0, 0)
+
+        return WindowStats(
+            count=int(self._count[hi] - self._count[lo]),
+            rating_sum=(self._rating_sum[hi] - self._rating_sum[lo]).item(),
+            positive=int(self._positive[hi] - self._positive[lo]),
+            negative=int(self._negative[hi] - self._negative[lo]),
+        )
+
+    def profile(self, today=None) -> 'ActivityProfile':
+        """Профиль уже построен, повторно его можно запросить только на ту же дату"""
+
+        if today is not None and today != self.today:
+            raise ValueError('Профиль построен на другую дату')
+
+        return self
+
+    @property
+    def years(self):
+        """Агрегаты за каждый из трех последних лет (окна по 365 дней)"""
+        return [self.window(y * 365, (y + 1) * 365) for y in range(0, 3)]
+
+    @property
+    def months(self):
+        """Агрегаты по месяцам на глубину профиля. Месяц k охватывает
+        возраст отзывов от 365 * k // 12 до 365 * (k + 1) // 12 дней"""
+        return [self._range(365 * k // 12, 365 * (k + 1) // 12) for k in range(0, 36)]
+
+
+class HistoryProfile(ActivityProfile):
+    """Профиль активности поверх ReviewHistory. Окна считаются бинарным поиском
+    по отсортированным датам истории и ее префиксным суммам, поэтому построение профиля
+    не требует раскладки отзывов по всей глубине профиля и для небольших историй почти бесплатно"""
+
+    def __init__(self, history: ReviewHistory, today):
+        self.today = today
+        self.total = history.stats()
+        self.last_date = history.dates[-1].item() if len(history) else None
+
+        # Даты и дата расчета - номерами дней, бинарный поиск по целым быстрее, чем по datetime64
+        self._today = today.toordinal() - EPOCH_ORDINAL
+        self._days = history.dates.view(np.int64)
+        self._rating_sum, self._positive, self._negative = history._prefix_sums()
+
+    def window(self, start=0, end=0) -> WindowStats:
+        """Окна считаются по всей истории, поэтому глубина профиля их не ограничивает,
+        как и окна ReviewBatch"""
+
+        assert start < end, 'Дельта окончания должна быть больше дельты начала'
+
+        return self._range(start + 1, end)
+
+    def _range(self, lo, hi) -> WindowStats:
+        if hi <= lo:
+            return WindowStats(0, 0, 0, 0)
+
+        # Возраст в [lo, hi) соответствует датам в (today - hi, today - lo]
+        i, j = self._days.searchsorted((self._today - hi, self._today - lo), side='right').tolist()
+
+        return WindowStats(
+            count=j - i,
+            rating_sum=(self._rating_sum[j] - self._rating_sum[i]).item(),
+            positive=int(self._positive[j] - self._positive[i]),
+            negative=int(self._negative[j] - self._negative[i]),
+        )
+
+
+class ReviewBatch:
+    """Истории множества сущностей в виде рваного массива:
+    даты и оценки всех сущностей идут подряд, а offsets задает границы сущностей,
+    так что отзывы сущности i лежат в срезе offsets[i]:offsets[i + 1]"""
+
+    def __init__(self, dates, offsets, ratings=None, today=None):
+        # Дата, на которую считаются окна, если она не передана явно
+        self.today = today if today is not None else datetime.now().date()
+
+        self.dates = _date_array(dates)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+        if ratings is None:
+            self.ratings = np.zeros(len(self.dates), dtype=np.int8)
+        else:
+            self.ratings = _compact_ratings(ratings)
+
+        assert self.offsets[0] == 0 and self.offsets[-1] == len(self.dates), 'Некорректные границы сущностей'
+        assert self.dates.shape == self.ratings.shape, 'Количество дат и оценок должно совпадать'
+
+        self._entities = None
+        self._ages = None
+        self._windows = {}
+
+    @classmethod
+    def from_histories(cls, histories, today=None) -> 'ReviewBatch':
+        histories = [as_history(h) for h in histories]
+
+        offsets = np.zeros(len(histories) + 1, dtype=np.int64)
+        np.cumsum([len(h) for h in histories], out=offsets[1:])
+
+        if not histories:
+            return cls(np.array([], dtype='datetime64[D]'), offsets, today=today)
+
+        return cls(
+            np.concatenate([h.dates for h in histories]),
+            offsets,
+            np.concatenate([h.ratings.astype(np.float64) for h in histories]),
+            today=today,
+        )
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def history(self, idx) -> ReviewHistory:
+        lo, hi = self.offsets[idx], self.offsets[idx + 1]
+
+        return ReviewHistory(self.dates[lo:hi], self.ratings[lo:hi])
+
+    @property
+    def entities(self) -> np.ndarray:
+        """Номер сущности для каждого отзыва"""
+
+        if self._entities is None:
+            self._entities = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.offsets))
+
+        return self._entities
+
+    def window(self, start=0, end=0, today=None) -> WindowStats:
+        """Агрегаты за окно (как в Period.from_delta) сразу для всех сущностей.
+        Каждое поле результата - массив длиной в количество сущностей"""
+
+        assert start < end, 'Дельта окончания должна быть больше дельты начала'
+
+        if today is None:
+            today = self.today
+
+        key = (today, start, end)
+        if key not in self._windows:
+            if self._ages is None or self._ages[0] != today:
+                self._ages = (today, (np.datetime64(today, 'D') - self.dates).astype(np.int64))
+
+            ages = self._ages[1]
+            mask = (ages > start) & (ages < end)
+
+            entities = self.entities[mask]
+            ratings = self.ratings[mask]
+            n = len(self)
+
+            self._windows[key] = WindowStats(
+                count=np.bincount(entities, minlength=n),
+                rating_sum=np.bincount(entities, weights=ratings, minlength=n),
+                positive=np.bincount(entities[ratings > POSITIVE_RATING_ABOVE], minlength=n),
+                negative=np.bincount(entities[ratings < NEGATIVE_RATING_BELOW], minlength=n),
+            )
+
+        return self._windows[key]
+
+
+def as_batch(histories, today=None) -> ReviewBatch:
+    """Приведение набора историй к ReviewBatch. Если передана дата,
+    окна пакета будут считаться на нее. Переданный пакет не изменяется:
+    для другой даты возвращается его копия, которая разделяет с ним массивы"""
+
+    if isinstance(histories, ReviewBatch):
+        if today is not None and today != histories.today:
+            histories = copy.copy(histories)
+            histories.today = today
+
+        return histories
+
+    return ReviewBatch.from_histories(histories, today=today)
+
+
+def as_history(items) -> ReviewHistory:
+    """Приведение произвольного набора отзывов к ReviewHistory"""
+
+    if isinstance(items, ReviewHistory):
+        return items
+
+    return ReviewHistory.from_items(items)
+
+
+def as_activity(items):
+    """ReviewHistory и готовые профили активности (в том числе накопители) передаются как есть,
+    остальные наборы отзывов приводятся к ReviewHistory"""
+
+    if isinstance(items, (ReviewHistory, ActivityProfile)):
+        return items
+
+    return ReviewHistory.from_items(items)
+
+
+def as_profile(items, today=None) -> ActivityProfile:
+    """Профиль активности для набора отзывов, истории или накопителя"""
+
+    return as_activity(items).profile(today)
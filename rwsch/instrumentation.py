@@ -0,0 +1,80 @@
+import sys
+import time
+from collections import defaultdict, Counter
+
+import numpy as np
+
+
+class InstrumentationSink:
+    """Приемник замеров горячих путей SchedulingService и SchedulingStrategy.
+    Базовый приемник ничего не делает: пока enabled = False, сервис и стратегии
+    даже не читают часы, поэтому накладные расходы сводятся к одной проверке флага"""
+
+    enabled = False
+
+    def record(self, stage: str, duration: float, **fields):
+        pass
+
+
+NULL_SINK = InstrumentationSink()
+
+
+def now() -> float:
+    return time.perf_counter()
+
+
+class StageAggregator(InstrumentationSink):
+    """Приемник, собирающий замеры по этапам для пакета сущностей
+    и выводящий p50/p99 длительности каждого этапа"""
+
+    enabled = True
+
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self.history_sizes = []
+        self.strategies = Counter()
+        self.satisfies_calls = 0
+        self.forecast_months = []
+
+    def record(self, stage: str, duration: float, **fields):
+        self.durations[stage].append(duration)
+
+        if stage == 'get_strategy':
+            self.history_sizes.append(fields.get('history_size', 0))
+            self.strategies[fields.get('strategy')] += 1
+            self.satisfies_calls += fields.get('satisfies_calls', 0)
+        elif stage == 'forecast_loop':
+            self.forecast_months.append(fields.get('months', 0))
+
+    def summary(self):
+        """{этап: {'count', 'total_s', 'p50_s', 'p99_s'}}"""
+
+        result = {}
+        for stage, durations in self.durations.items():
+            durations = np.asarray(durations)
+
+            result[stage] = {
+                'count': len(durations),
+                'total_s': float(durations.sum()),
+                'p50_s': float(np.percentile(durations, 50)),
+                'p99_s': float(np.percentile(durations, 99)),
+            }
+
+        return result
+
+    def report(self, file=None):
+        file = file if file is not None else sys.stdout
+
+        print('%-16s %10s %12s %12s %12s' % ('stage', 'count', 'total, s', 'p50, ms', 'p99, ms'), file=file)
+        for stage, stats in sorted(self.summary().items()):
+            print('%-16s %10d %12.4f %12.4f %12.4f' % (
+                stage, stats['count'], stats['total_s'], stats['p50_s'] * 1000, stats['p99_s'] * 1000
+            ), file=file)
+
+        if self.strategies:
+            print('strategies: %s' % ', '.join('%s=%d' % (k, v) for k, v in self.strategies.most_common()), file=file)
+            print('satisfies calls: %d' % self.satisfies_calls, file=file)
+
+        if self.forecast_months:
+            months = self.forecast_months
+            print('forecast months: mean %.1f, max %d' % (np.mean(months), max(months)), file=file)
@@ -1,75 +1,239 @@
-import random
+import inspect
 from abc import abstractmethod, ABC
+from collections import namedtuple
 from datetime import timedelta, datetime
 from enum import Enum
+from functools import lru_cache
 from typing import Type, List
 
+import numpy as np
+
+from rwsch import instrumentation
+from rwsch.history import as_history, as_batch, as_activity, as_profile, Review, ReviewItem
+from rwsch.instrumentation import InstrumentationSink, NULL_SINK
+
 
 class Period:
     def __init__(self, start, end):
         self.start = start
         self.end = end
 
-    def satisfied(self, item) -> bool:
-        assert hasattr(item, 'date')
+    def satisfied(self, item: ReviewItem) -> bool:
+        if type(item) is not Review:
+            assert hasattr(item, 'date')
 
         return self.start > item.date > self.end
 
+    def mask(self, items):
+        """Векторная маска попадания отзывов в период"""
+        return as_history(items).mask(self)
+
+    def count(self, items) -> int:
+        return as_history(items).count(self)
+
+    def stats(self, items):
+        """Агрегаты отзывов за период, см. ReviewHistory.stats"""
+        return as_history(items).stats(self)
+
     @classmethod
-    def from_delta(cls, start=0, end=0):
+    def from_delta(cls, start=0, end=0, today=None):
+        """Период, отсчитываемый от даты today (по умолчанию - от текущей даты)"""
+
         assert start < end, 'Дельта окончания должна быть больше дельты начала'
 
+        if today is None:
+            today = datetime.now().date()
+
         return cls(
-            start=(datetime.now() - timedelta(days=start)).date(),
-            end=(datetime.now() - timedelta(days=end)).date()
+            start=today - timedelta(days=start),
+            end=today - timedelta(days=end)
         )
 
 
+# Декларативный порог активности: количество отзывов за окно window (дельты в днях, как в Period.from_delta),
+# деленное на divisor, должно быть не меньше minimum
+ActivityThreshold = namedtuple('ActivityThreshold', ['window', 'divisor', 'minimum'])
+
+
 class ForecastLimitItem(Enum):
     PERIOD = 0
     RATING = 1
 
 
-def distribute(n_items: int = 1, n_receivers: int = 1):
+@lru_cache(maxsize=None)
+def _distribution_chances(n_receivers: int) -> np.ndarray:
+    """Шанс получателя на ресурс (в процентах) в зависимости от остатка ресурсов.
+    Считается так же, как в исходной пошаговой версии distribute,
+    включая особенности округления float. Таблица кешируется, поэтому возвращается только для чтения"""
+
+    chances = np.array([int(round(n / float(n_receivers), 2) * 100) for n in range(0, n_receivers)], dtype=np.int64)
+    chances.setflags(write=False)
+
+    return chances
+
+
+def _distribute_remainder(left: int, chances, rng: np.random.Generator) -> list:
+    """Раздача остатка left одной сущности теми же раундами, что и в distribute_batch:
+    случайные числа берутся из генератора в том же порядке, поэтому результат совпадает.
+    Для одной сущности раунды дешевле считать без векторных операций"""
+
+    n_receivers = len(chances)
+    given = [0] * n_receivers
+
+    while left:
+        threshold = int(chances[left]) + 1
+
+        for k, draw in enumerate(rng.random(n_receivers).tolist()):
+            if draw * 101 < threshold and left:
+                given[k] += 1
+                left -= 1
+
+    return given
+
+
+def distribute_batch(n_items, n_receivers: int = 1, rng: np.random.Generator = None) -> np.ndarray:
+    """Векторная версия distribute для множества сущностей сразу.
+    n_items - массив количества ресурсов для каждой сущности,
+    результат - матрица (количество сущностей x n_receivers).
+
+    Распределение совпадает с исходным пошаговым алгоритмом:
+    пока ресурсов не меньше, чем получателей, каждый получатель по очереди получает по одному ресурсу,
+    поэтому эти раунды заменяются целочисленным делением.
+    Остаток раздается раундами, в каждом из которых получатели по порядку получают ресурс
+    с вероятностью (chance + 1) / 101, пока ресурсы не закончатся. Для каждого раунда
+    случайные числа генерируются одним массивом сразу для всех получателей и сущностей,
+    так что стоимость зависит от количества получателей, а не ресурсов"""
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    n_items = np.asarray(n_items, dtype=np.int64)
+    assert np.all(n_items >= 0), 'Количество ресурсов не может быть отрицательным'
+
+    receivers = np.repeat((n_items // n_receivers)[:, None], n_receivers, axis=1)
+    remaining = n_items % n_receivers
+
+    chances = _distribution_chances(n_receivers)
+
+    active = np.flatnonzero(remaining)
+    while active.size > 1:
+        left = remaining[active]
+
+        accepted = rng.random((active.size, n_receivers)) * 101 < (chances[left] + 1)[:, None]
+        # Ресурс получают только те, кто прошел проверку, пока ресурсы не исчерпаны
+        given = accepted & (np.cumsum(accepted, axis=1) <= left[:, None])
+
+        receivers[active] += given
+        remaining[active] = left - given.sum(axis=1)
+
+        active = active[remaining[active] > 0]
+
+    # Последняя сущность с остатком (часто единственная) дораздается без векторных операций
+    if active.size:
+        idx = active[0]
+        receivers[idx] += _distribute_remainder(int(remaining[idx]), chances, rng)
+
+    return receivers
+
+
+def distribute(n_items: int = 1, n_receivers: int = 1, rng: np.random.Generator = None):
     """Функция distribute распределяет количество ресурсов - n_items
     между количеством получателей - n_receivers.
     В результате возвращается список длиной n_receivers, заполненый значениями ресурсов,
-    которое предназначено каждому из получателей"""
+    которое предназначено каждому из получателей.
+    Случайные числа берутся из генератора rng, если он не передан - создается новый"""
 
-    # генерируем список получателей
-    receivers = [0 for _ in range(0, n_receivers)]
+    assert n_items >= 0, 'Количество ресурсов не может быть отрицательным'
 
-    while n_items > 0:
-        # Каждая итерация в этом цикле определяет шансы каждого получателя на получение ресурса
+    if rng is None:
+        rng = np.random.default_rng()
 
-        if n_items >= len(receivers):
-            # Если ресурсов больше, чем получателей, то шанс = 100
-            chance = 100
-        else:
-            # Иначе рассчитываем шанс через соотношение количества получателей и ресурсов
-            chance = int(
-                round(n_items / float(len(receivers)), 2) * 100
-            )
+    base, left = divmod(int(n_items), n_receivers)
+    given = _distribute_remainder(left, _distribution_chances(n_receivers), rng)
 
-        receiver_idx = 0
-        while True:
-            if chance == 100 or random.randint(0, 100) <= chance:
-                receivers[receiver_idx] += 1
-                n_items -= 1
+    return [base + g for g in given]
 
-            # Останавливаем цикл, если ресурсы исчерпаны
-            if n_items == 0:
-                break
 
-            if receiver_idx < (len(receivers) - 1):
-                receiver_idx += 1
-            else:
-                break
+def check_forecast_limit(limit_item: ForecastLimitItem, limit_value):
+    if limit_item == ForecastLimitItem.PERIOD:
+        assert limit_value in range(1, 13), "Period limit must be in range 1, 12"
+    elif limit_item == ForecastLimitItem.RATING:
+        assert 1 <= limit_value <= 5, "Rating limit must be in range 1, 5"
+    else:
+        raise ValueError('Unknown limit item')
 
-    return receivers
+
+def forecast_limit_reached(limit_item: ForecastLimitItem, limit_value, month) -> bool:
+    """Проверка, что месяц прогноза month является последним для ограничения"""
+
+    if limit_item == ForecastLimitItem.PERIOD:
+        return month['period_number'] == limit_value
+
+    return month['rating_avg'] >= limit_value
+
+
+def months_to_target(rating_avg, targets) -> np.ndarray:
+    """Номер месяца прогноза (с 1), в котором средняя оценка впервые достигает каждой из целей targets,
+    0 - цель не достигнута за срок прогноза.
+    rating_avg - оценки по месяцам (вектор) или матрица (количество вариантов x месяцы).
+    Накопленный максимум оценки не убывает, поэтому месяц достижения ищется бинарным поиском"""
+
+    rating_avg = np.asarray(rating_avg, dtype=np.float64)
+    targets = np.asarray(targets, dtype=np.float64)
+
+    best = np.maximum.accumulate(rating_avg, axis=-1)
+
+    if best.ndim == 1:
+        reached = np.searchsorted(best, targets, side='left')
+    else:
+        # Для матрицы количество месяцев до достижения цели считается по всем строкам сразу
+        reached = (best[..., None, :] < targets[..., None]).sum(axis=-1)
+
+    return np.where(reached < best.shape[-1], reached + 1, 0)
+
+
+@lru_cache(maxsize=None)
+def _accepts_today(satisfies) -> bool:
+    """Принимает ли функция satisfies дату расчета today"""
+
+    parameters = inspect.signature(satisfies).parameters.values()
+
+    return any(p.name == 'today' or p.kind == p.VAR_KEYWORD for p in parameters)
 
 
 class SchedulingStrategy(ABC):
+    # Пороги активности стратегии. Стратегия подходит, если выполнен хотя бы один из порогов.
+    # Стратегии, которые нельзя описать порогами, переопределяют satisfies
+    thresholds = None
+
+    def __init__(self, rng: np.random.Generator = None, reference_date=None, sink: InstrumentationSink = None):
+        # Все случайные решения стратегии (расписание, проекция) берутся из этого генератора,
+        # что позволяет воспроизводить результат при фиксированном seed
+        self._rng = rng
+
+        # Дата, от которой отсчитываются окна истории. Если не задана, используется текущая
+        self.reference_date = reference_date
+
+        # Приемник замеров этапов прогноза, по умолчанию ничего не делает
+        self.sink = sink if sink is not None else NULL_SINK
+
+    @property
+    def rng(self) -> np.random.Generator:
+        """Генератор случайных чисел. Если он не передан, создается при первом обращении:
+        инициализация из энтропии ОС заметно дороже выбора стратегии"""
+
+        if self._rng is None:
+            self._rng = np.random.default_rng()
+
+        return self._rng
+
+    @rng.setter
+    def rng(self, rng: np.random.Generator):
+        self._rng = rng
+
+    def _profile(self, items):
+        return as_activity(items).profile(self.reference_date)
+
     @abstractmethod
     def get_schedule(self, items):
         """Рассчет расписания постинга для конерктного класса стратегии
@@ -79,6 +243,24 @@ class SchedulingStrategy(ABC):
         [1, 0, 2, ..., 3]"""
         pass
 
+    def get_schedules(self, items, n_samples: int) -> np.ndarray:
+        """Несколько независимых реализаций расписания постинга в виде матрицы (n_samples x 12).
+        По умолчанию get_schedule вызывается n_samples раз, стратегии могут
+        переопределить метод векторной генерацией"""
+
+        items = as_activity(items)
+
+        schedules = [self.get_schedule(items) for _ in range(0, n_samples)]
+
+        return np.array(schedules, dtype=np.int64).reshape(n_samples, 12)
+
+    def _get_projection_params(self, items):
+        """Средняя оценка и количество отзывов за последний год, на которых строится проекция"""
+
+        last_year = self._profile(items).window(0, 365)
+
+        return last_year.rating_sum / float(last_year.count), last_year.count
+
     def _get_projection(self, items):
         """Рассчет проекции динамики отзывов из прошлого для конкретного класса стратегии.
         Строится на основании среднего количества отзывов в месяц и средней оценки за определенный период.
@@ -87,82 +269,363 @@ class SchedulingStrategy(ABC):
         Если в конкретном месяце не предвидится постов, то в качестве значения нужно использовать пустой список:
         [[3.5, 3.5, 3.5], [], [3.5, 3.5, 3.5], ..., [3.5, 3.5, 3.5]]"""
 
-        last_year = Period.from_delta(0, 365)
+        items_rating, items_count = self._get_projection_params(items)
 
-        items_last_year = list(i for i in items if last_year.satisfied(i))
-        items_rating = sum([i.rating for i in items_last_year]) / float(len(items_last_year))
-
-        items_projection = distribute(len(items_last_year), 12)
+        items_projection = distribute(items_count, 12, rng=self.rng)
 
         return [[items_rating for _ in range(0, items_per_month)] for items_per_month in items_projection]
 
-    def get_forecast(self, items, limit_item: ForecastLimitItem, limit_value):
-        if limit_item == ForecastLimitItem.PERIOD:
-            assert limit_value in range(1, 13), "Period limit must be in range 1, 12"
-        elif limit_item == ForecastLimitItem.RATING:
-            assert limit_value in range(1, 6), "Rating limit must be in range 1, 5"
-        else:
-            raise ValueError('Unknown limit item')
+    def _get_projections(self, items, n_samples: int):
+        """Несколько независимых реализаций проекции: средняя оценка
+        и матрица количества отзывов по месяцам (n_samples x 12)"""
 
-        schedule = self.get_schedule(items)
-        projection = self._get_projection(items)
+        items_rating, items_count = self._get_projection_params(items)
 
-        # Для определения достижения оценки может понадобиться расширить расписание постинга
-        # Максимальный срок для прогноза достижения оценки составляет 36 месяцев
-        if limit_item == ForecastLimitItem.RATING:
-            # К стандартному расписанию постинга, которое составляет 12 месяцев, добавим еще 24
-            # В качестве количества постов для каждого добавленного месяца
-            # возьмем среднее количество из стандартного расписания за 3 последних месяца
-            schedule += [int(sum(schedule[-3:]) / 3.0) for _ in range(0, 24)]
+        return items_rating, distribute_batch(np.full(n_samples, items_count), 12, rng=self.rng)
+
+    @staticmethod
+    def _extend_timeline(schedule, projection):
+        """Расширение расписания и проекции с 12 до 36 месяцев для прогноза достижения оценки"""
+
+        # К стандартному расписанию постинга, которое составляет 12 месяцев, добавим еще 24
+        # В качестве количества постов для каждого добавленного месяца
+        # возьмем среднее количество из стандартного расписания за 3 последних месяца
+        schedule += [int(sum(schedule[-3:]) / 3.0) for _ in range(0, 24)]
+
+        # Проекцию увеличим в 2 раза
+        projection.extend(projection * 2)
+
+        return schedule, projection
 
-            # Проекцию увеличим в 2 раза
-            projection.extend(projection * 2)
+    @staticmethod
+    def _get_rating_curve(totals, schedule, projection):
+        """Накопленное количество отзывов и средняя оценка по месяцам прогноза.
+        Прирост каждого месяца и накопление считаются в том же порядке, что и в цикле get_forecast,
+        поэтому значения совпадают с ним в точности"""
+
+        items_added = [totals.count] + [len(p) + s for p, s in zip(projection, schedule)]
+        ratings_added = [totals.rating_sum] + [sum(p) + 5 * s for p, s in zip(projection, schedule)]
+
+        items_total = np.cumsum(np.array(items_added, dtype=np.int64))[1:]
+        ratings_total = np.cumsum(np.array(ratings_added, dtype=np.float64))[1:]
+
+        return items_total, ratings_total / items_total
+
+    def get_target_months(self, items, targets) -> np.ndarray:
+        """Месяц достижения каждой из целевых оценок targets (от 1 до 5, в том числе дробных)
+        без помесячного моделирования. Результат совпадает с номером последнего месяца
+        get_forecast с ограничением RATING при том же состоянии генератора, 0 - цель не достигнута за 36 месяцев"""
+
+        targets = np.atleast_1d(np.asarray(targets, dtype=np.float64))
+        for target in targets:
+            check_forecast_limit(ForecastLimitItem.RATING, target)
+
+        items = as_activity(items)
+
+        schedule, projection = self._extend_timeline(self.get_schedule(items), self._get_projection(items))
+        _, rating_avg = self._get_rating_curve(self._profile(items).total, schedule, projection)
+
+        return months_to_target(rating_avg, targets)
+
+    @staticmethod
+    def _iter_months(totals, schedule, projection):
+        """Помесячный прогноз от итогов истории totals по расписанию и проекции"""
 
         # Скомпонуем расписание и проекцию в один список для удобства итерирования
         future = zip(projection, schedule)
 
-        forecast = []
-        ratings = [i.rating for i in items]
+        # Вместо списка всех оценок храним только текущие количество и сумму оценок,
+        # поэтому каждый месяц прогноза обрабатывается за O(1)
+        items_total = totals.count
+        ratings_total = totals.rating_sum
+
         for period_num, (items_projected, items_scheduled) in enumerate(future, start=1):
-            ratings += [rating for rating in items_projected]
-            ratings += [5 for _ in range(0, items_scheduled)]
+            projected_sum = sum(items_projected)
 
-            rating_current_month = sum(ratings) / float(len(ratings))
+            items_total += len(items_projected) + items_scheduled
+            ratings_total += projected_sum + 5 * items_scheduled
 
-            forecast.append({
+            rating_current_month = ratings_total / float(items_total)
+
+            yield {
                 'period_number': period_num,
                 'items_from_sch': items_scheduled,
                 'rating_from_sch': 5 if items_scheduled > 0 else '-',
                 'items_from_history': len(items_projected),
-                'rating_from_history': sum(items_projected) / len(items_projected) if len(items_projected) > 0 else '-',
-                'items_total': len(ratings),
+                'rating_from_history': projected_sum / len(items_projected) if len(items_projected) > 0 else '-',
+                'items_total': items_total,
                 'rating_avg': rating_current_month,
-            })
+            }
+
+    def iter_forecast(self, items):
+        """Ленивый прогноз на полные 36 месяцев: генератор месяцев в формате get_forecast.
+        Расписание и проекция строятся один раз при запросе первого месяца,
+        поэтому вызывающий может прекратить перебор в любой момент"""
+
+        items = as_activity(items)
+
+        schedule, projection = self._extend_timeline(self.get_schedule(items), self._get_projection(items))
+
+        yield from self._iter_months(self._profile(items).total, schedule, projection)
+
+    def get_forecasts(self, items, limits) -> dict:
+        """Прогнозы для нескольких ограничений по одной реализации расписания и проекции.
+        limits - список пар (ForecastLimitItem, значение), результат - словарь {пара: прогноз}.
+        Каждый прогноз совпадает с результатом get_forecast при том же состоянии генератора,
+        а все прогнозы являются началами одной и той же последовательности месяцев"""
 
-            if limit_item == ForecastLimitItem.PERIOD and period_num == limit_value:
+        limits = list(limits)
+        for limit_item, limit_value in limits:
+            check_forecast_limit(limit_item, limit_value)
+
+        forecasts = {}
+        pending = list(limits)
+
+        months = []
+        for month in self.iter_forecast(items):
+            months.append(month)
+
+            for limit in list(pending):
+                if forecast_limit_reached(limit[0], limit[1], month):
+                    forecasts[limit] = months[:]
+                    pending.remove(limit)
+
+            if not pending:
                 break
 
-            elif limit_item == ForecastLimitItem.RATING and rating_current_month >= limit_value:
+        # Оценка, не достигнутая за 36 месяцев, получает прогноз на весь срок
+        for limit in pending:
+            forecasts[limit] = months[:]
+
+        return {limit: forecasts[limit] for limit in limits}
+
+    def get_forecast(self, items, limit_item: ForecastLimitItem, limit_value):
+        """Прогноз по месяцам до ограничения. Список отзывов каждый раз преобразуется заново,
+        поэтому вызывающий, который уже выбирал стратегию по тем же отзывам, может передать
+        и сюда, и в SchedulingService.get_strategy одну и ту же ReviewHistory"""
+
+        check_forecast_limit(limit_item, limit_value)
+
+        sink = self.sink
+        if sink.enabled:
+            started = instrumentation.now()
+
+        items = as_activity(items)
+
+        schedule = self.get_schedule(items)
+        if sink.enabled:
+            scheduled = instrumentation.now()
+            sink.record('get_schedule', scheduled - started)
+
+        projection = self._get_projection(items)
+        if sink.enabled:
+            projected = instrumentation.now()
+            sink.record('projection', projected - scheduled)
+
+        # Для определения достижения оценки может понадобиться расширить расписание постинга
+        # Максимальный срок для прогноза достижения оценки составляет 36 месяцев
+        if limit_item == ForecastLimitItem.RATING:
+            schedule, projection = self._extend_timeline(schedule, projection)
+
+        forecast = []
+        for month in self._iter_months(self._profile(items).total, schedule, projection):
+            forecast.append(month)
+
+            if forecast_limit_reached(limit_item, limit_value, month):
                 break
 
+        if sink.enabled:
+            finished = instrumentation.now()
+            sink.record('forecast_loop', finished - projected, months=len(forecast))
+            sink.record('get_forecast', finished - started)
+
         return forecast
 
     @classmethod
-    @abstractmethod
-    def satisfies(cls, items) -> bool:
-        pass
+    def has_custom_satisfies(cls) -> bool:
+        return cls.satisfies.__func__ is not SchedulingStrategy.satisfies.__func__
 
+    @classmethod
+    def satisfies(cls, items, today=None) -> bool:
+        """Проверка истории на соответствие стратегии на дату today (по умолчанию - на текущую).
+        По умолчанию проверяются пороги thresholds"""
+
+        if cls.thresholds is None:
+            raise NotImplementedError('Strategy must define thresholds or override satisfies')
+
+        profile = as_profile(items, today)
+
+        return any(profile.window(*t.window).count / t.divisor >= t.minimum for t in cls.thresholds)
+
+    @classmethod
+    def satisfies_on(cls, items, today) -> bool:
+        """Вызов satisfies с датой расчета today. Собственный satisfies, объявленный
+        без параметра today, вызывается с одними отзывами и считает окна сам"""
+
+        if _accepts_today(cls.satisfies.__func__):
+            return cls.satisfies(items, today=today)
+
+        return cls.satisfies(items)
+
+    @classmethod
+    def satisfies_batch(cls, batch) -> np.ndarray:
+        """Векторная версия satisfies для ReviewBatch: возвращает булев массив по сущностям.
+        Пороги thresholds проверяются векторно, для стратегий с собственным satisfies
+        он вызывается для каждой сущности"""
+
+        if not cls.has_custom_satisfies():
+            counts = {t.window: batch.window(*t.window).count for t in cls.thresholds}
+
+            return DecisionTable.check(cls.thresholds, counts)
+
+        return np.fromiter(
+            (cls.satisfies_on(batch.history(i), batch.today) for i in range(len(batch))), dtype=bool, count=len(batch)
+        )
+
+
+class DecisionTable:
+    """Скомпилированная таблица выбора стратегии.
+    Пороги всех стратегий из strategy_list собираются в одну таблицу, а окна,
+    на которых они считаются, - в общий набор, поэтому количество отзывов за каждое окно
+    считается один раз на сущность (или на пакет сущностей). Стратегии с собственным satisfies
+    остаются в таблице на своем месте и проверяются вызовом satisfies"""
 
-class SchedulingService:
     def __init__(self, strategy_list: List[Type[SchedulingStrategy]]):
+        self.strategy_list = strategy_list
+
+        windows = []
+        self.rules = []
+        for strategy_cls in strategy_list:
+            if strategy_cls.has_custom_satisfies():
+                self.rules.append(None)
+                continue
+
+            if strategy_cls.thresholds is None:
+                raise NotImplementedError('Strategy must define thresholds or override satisfies')
+
+            for threshold in strategy_cls.thresholds:
+                if threshold.window not in windows:
+                    windows.append(threshold.window)
+
+            self.rules.append(tuple(strategy_cls.thresholds))
+
+        self.windows = windows
+
+    @staticmethod
+    def check(thresholds, counts):
+        """Проверка порогов по заранее посчитанным количествам отзывов {окно: количество}.
+        Количества могут быть как числами, так и массивами по сущностям"""
+
+        result = False
+        for t in thresholds:
+            result = result | (counts[t.window] / t.divisor >= t.minimum)
+
+        return result
+
+    def evaluate(self, items, today=None) -> int:
+        """Индекс первой подходящей стратегии для одной сущности на дату today (по умолчанию - на текущую),
+        -1 - если ни одна не подошла"""
+
+        if today is None:
+            today = datetime.now().date()
+
+        profile = as_profile(items, today)
+        counts = {window: profile.window(*window).count for window in self.windows}
+
+        for idx, rules in enumerate(self.rules):
+            if rules is None:
+                if self.strategy_list[idx].satisfies_on(items, today):
+                    return idx
+            elif self.check(rules, counts):
+                return idx
+
+        return -1
+
+    def evaluate_batch(self, batch) -> np.ndarray:
+        """Индексы стратегий для всех сущностей пакета"""
+
+        counts = {window: batch.window(*window).count for window in self.windows}
+
+        result = np.full(len(batch), -1, dtype=np.int16)
+        undecided = np.ones(len(batch), dtype=bool)
+
+        for idx, rules in enumerate(self.rules):
+            if not undecided.any():
+                break
+
+            if rules is None:
+                matched = self.strategy_list[idx].satisfies_batch(batch)
+            else:
+                matched = self.check(rules, counts)
+
+            matched = undecided & matched
+
+            result[matched] = idx
+            undecided &= ~matched
+
+        return result
+
+
+class SchedulingService:
+    def __init__(self, strategy_list: List[Type[SchedulingStrategy]], reference_date=None,
+                 sink: InstrumentationSink = None):
         self._strategy_list = strategy_list
+        self._decision_table = DecisionTable(strategy_list)
+
+        # Приемник замеров выбора стратегии, передается и в созданные стратегии
+        self.sink = sink if sink is not None else NULL_SINK
+
+        # Дата, на которую считаются окна истории для всех сущностей.
+        # Если не задана, дата определяется один раз на каждый вызов
+        self.reference_date = reference_date
+
+    def _get_reference_date(self):
+        if self.reference_date is not None:
+            return self.reference_date
+
+        return datetime.now().date()
+
+    def get_strategy(self, items, rng: np.random.Generator = None):
+        sink = self.sink
+        if sink.enabled:
+            started = instrumentation.now()
+
+        reference_date = self._get_reference_date()
+
+        items = as_activity(items)
+        profile = items.profile(reference_date)
+
+        strategy_idx = self._decision_table.evaluate(items, reference_date)
 
-    def get_strategy(self, items):
         strategy = None
-        for strategy_cls in self._strategy_list:
-            if strategy_cls.satisfies(items):
-                strategy = strategy_cls()
-                break
+        if strategy_idx >= 0:
+            strategy = self._strategy_list[strategy_idx](rng=rng, reference_date=reference_date, sink=sink)
+
+        if sink.enabled:
+            sink.record(
+                'get_strategy',
+                instrumentation.now() - started,
+                history_size=profile.total.count,
+                strategy=type(strategy).__name__ if strategy is not None else None,
+                satisfies_calls=strategy_idx + 1 if strategy_idx >= 0 else len(self._strategy_list),
+            )
+
+        return strategy
+
+    def get_strategies(self, histories) -> np.ndarray:
+        """Пакетное определение стратегий для множества сущностей.
+        Принимает ReviewBatch или набор историй, возвращает массив индексов стратегий
+        в strategy_list (первая подходящая стратегия побеждает), -1 - если ни одна не подошла"""
+
+        sink = self.sink
+        if sink.enabled:
+            started = instrumentation.now()
+
+        batch = as_batch(histories, self._get_reference_date())
+
+        result = self._decision_table.evaluate_batch(batch)
+
+        if sink.enabled:
+            sink.record('get_strategies', instrumentation.now() - started, entities=len(batch))
 
-        if strategy is not None:
-            return strategy
+        return result
@@ -0,0 +1,100 @@
+import sqlite3
+import time
+from collections import namedtuple
+
+import numpy as np
+
+# rows - количество записанных публикаций, seconds - время записи, rows_per_second - скорость записи
+CalendarReport = namedtuple('CalendarReport', ['rows', 'seconds', 'rows_per_second'])
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS publications ('
+    'reference_date TEXT NOT NULL, entity_id TEXT NOT NULL, month INTEGER NOT NULL, '
+    'slot INTEGER NOT NULL, date TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS publications_entity ON publications (entity_id)',
+    'CREATE INDEX IF NOT EXISTS publications_date ON publications (date)',
+    'CREATE INDEX IF NOT EXISTS publications_reference ON publications (reference_date, entity_id)',
+)
+
+_DELETE = 'DELETE FROM publications WHERE reference_date = ? AND entity_id = ?'
+
+_INSERT = 'INSERT INTO publications (reference_date, entity_id, month, slot, date) VALUES (?, ?, ?, ?, ?)'
+
+
+def publication_slots(schedules, reference_date):
+    """Даты публикаций по расписаниям постинга (количество сущностей x месяцы).
+    Месяц k расписания (с 1) - k-й календарный месяц после месяца reference_date.
+    Публикации месяца равномерно распределяются по его дням: публикация i из n
+    приходится на день floor((i + 0.5) * дней в месяце / n).
+    Возвращает массивы номера сущности, месяца, номера публикации в месяце и даты"""
+
+    schedules = np.asarray(schedules, dtype=np.int64)
+    assert schedules.ndim == 2, 'Расписания задаются матрицей (сущности x месяцы)'
+    assert np.all(schedules >= 0), 'Количество публикаций не может быть отрицательным'
+
+    n_months = schedules.shape[1]
+    counts = schedules.ravel()
+
+    cells = np.repeat(np.arange(0, counts.size), counts)
+    entities, months = np.divmod(cells, n_months)
+
+    # Номер публикации внутри месяца сущности
+    starts = np.cumsum(counts) - counts
+    slots = np.arange(0, cells.size) - starts[cells]
+
+    first_month = np.datetime64(reference_date, 'M') + 1
+    month_starts = (first_month + np.arange(0, n_months + 1)).astype('datetime64[D]')
+    month_days = np.diff(month_starts).astype(np.int64)
+
+    offsets = (2 * slots + 1) * month_days[months] // (2 * counts[cells])
+    dates = month_starts[months] + offsets
+
+    return entities, months + 1, slots, dates
+
+
+def materialize_calendar(path, entity_ids, schedules, reference_date, batch_size: int = 10000) -> CalendarReport:
+    """Запись календаря публикаций в базу SQLite по пути path.
+    Строки пишутся пакетами по batch_size через executemany в одной транзакции.
+    Предыдущий календарь записываемых сущностей на ту же reference_date удаляется в той же транзакции,
+    поэтому повторный запуск на ту же дату не создает дублей, а запуск для части сущностей
+    не затрагивает остальные. Первичного ключа у таблицы нет: повторы исключает это удаление
+    (по индексу (reference_date, entity_id)), а ключ заметно замедлил бы вставку"""
+
+    assert batch_size > 0, 'Размер пакета должен быть положительным'
+    assert len(entity_ids) == len(schedules), 'Количество сущностей и расписаний должно совпадать'
+
+    started = time.perf_counter()
+
+    entities, months, slots, dates = publication_slots(schedules, reference_date)
+
+    reference = reference_date.isoformat()
+    entity_ids = [str(e) for e in entity_ids]
+
+    connection = sqlite3.connect(str(path))
+    try:
+        for statement in _SCHEMA:
+            connection.execute(statement)
+
+        with connection:
+            connection.executemany(_DELETE, ((reference, entity_id) for entity_id in entity_ids))
+
+            for lo in range(0, len(dates), batch_size):
+                hi = lo + batch_size
+
+                connection.executemany(_INSERT, zip(
+                    [reference] * len(dates[lo:hi]),
+                    [entity_ids[e] for e in entities[lo:hi].tolist()],
+                    months[lo:hi].tolist(),
+                    slots[lo:hi].tolist(),
+                    np.datetime_as_string(dates[lo:hi]).tolist(),
+                ))
+    finally:
+        connection.close()
+
+    seconds = time.perf_counter() - started
+
+    return CalendarReport(
+        rows=len(dates),
+        seconds=seconds,
+        rows_per_second=len(dates) / seconds if seconds > 0 else float('inf'),
+    )
@@ -0,0 +1,103 @@
+import csv
+import json
+import os
+from itertools import islice
+
+import numpy as np
+
+from rwsch.history import ReviewHistory
+
+
+def _detect_format(path) -> str:
+    extension = os.path.splitext(str(path))[1].lower()
+
+    if extension == '.csv':
+        return 'csv'
+    elif extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+
+    raise ValueError('Unknown review export format: %s' % path)
+
+
+def _iter_rows(path, fmt, entity_field, date_field, rating_field):
+    with open(path, newline='', encoding='utf-8') as fh:
+        if fmt == 'csv':
+            for row in csv.DictReader(fh):
+                yield row[entity_field], row[date_field], row[rating_field]
+        elif fmt == 'jsonl':
+            for line in fh:
+                if not line.strip():
+                    continue
+
+                record = json.loads(line)
+                yield record[entity_field], record[date_field], record[rating_field]
+        else:
+            raise ValueError('Unknown review export format: %s' % fmt)
+
+
+def read_histories(path, fmt: str = None, entity_field: str = 'entity_id', date_field: str = 'date',
+                   rating_field: str = 'rating', chunk_size: int = 10000):
+    """Потоковое чтение выгрузки отзывов в CSV или JSONL.
+    Строки должны быть сгруппированы по сущностям (например, отсортированы по entity_field).
+    Файл читается пакетами по chunk_size строк, даты (ISO 8601) и оценки разбираются векторно,
+    в памяти одновременно находятся только текущий пакет и отзывы текущей сущности.
+    Возвращает генератор пар (идентификатор сущности, ReviewHistory)"""
+
+    assert chunk_size > 0, 'Размер пакета должен быть положительным'
+
+    fmt = fmt or _detect_format(path)
+    rows = _iter_rows(path, fmt, entity_field, date_field, rating_field)
+
+    current_id = None
+    dates_parts = []
+    ratings_parts = []
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        entity_ids, dates, ratings = zip(*chunk)
+
+        entity_ids = np.array(entity_ids, dtype=object)
+        dates = np.array([str(d)[:10] for d in dates], dtype='datetime64[D]')
+        ratings = np.array(ratings, dtype=np.float64)
+
+        # Границы сущностей внутри пакета
+        bounds = np.concatenate(([0], np.flatnonzero(entity_ids[1:] != entity_ids[:-1]) + 1, [len(chunk)]))
+
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            entity_id = entity_ids[lo]
+
+            if entity_id != current_id and dates_parts:
+                yield current_id, ReviewHistory(np.concatenate(dates_parts), np.concatenate(ratings_parts))
+                dates_parts = []
+                ratings_parts = []
+
+            current_id = entity_id
+            dates_parts.append(dates[lo:hi])
+            ratings_parts.append(ratings[lo:hi])
+
+    if dates_parts:
+        yield current_id, ReviewHistory(np.concatenate(dates_parts), np.concatenate(ratings_parts))
+
+
+def write_results(results, path) -> int:
+    """Построчная запись результатов FleetRunner в JSONL по мере их поступления.
+    Возвращает количество записанных сущностей"""
+
+    written = 0
+
+    with open(path, 'w', encoding='utf-8') as fh:
+        for result in results:
+            fh.write(json.dumps({
+                'entity_id': result.entity_id,
+                'strategy': result.strategy.__name__ if result.strategy is not None else None,
+                'forecast': result.forecast,
+                'error': repr(result.error) if result.error is not None else None,
+            }, ensure_ascii=False))
+            fh.write('\n')
+
+            written += 1
+
+    return written
@@ -0,0 +1,109 @@
+from collections import namedtuple
+
+import numpy as np
+
+from rwsch.history import as_activity
+from rwsch.models import SchedulingStrategy, ForecastLimitItem, check_forecast_limit, months_to_target
+
+# rating_mean - средняя оценка по месяцам, rating_percentiles - словарь {перцентиль: оценки по месяцам},
+# target_months - для RATING количество реализаций, достигших оценки в каждом месяце:
+# элемент 0 - не достигли за весь срок прогноза, элемент k - достигли в k-м месяце
+ForecastSimulation = namedtuple('ForecastSimulation', ['rating_mean', 'rating_percentiles', 'target_months'])
+
+# items_total и rating_avg - матрицы (количество вариантов x месяцы),
+# target_months - матрица (количество вариантов x количество целей), 0 - цель не достигнута
+ScheduleSweep = namedtuple('ScheduleSweep', ['items_total', 'rating_avg', 'target_months'])
+
+
+def simulate_forecast(strategy: SchedulingStrategy, items, limit_item: ForecastLimitItem, limit_value,
+                      n_samples: int = 1000, percentiles=(5, 25, 50, 75, 95)) -> ForecastSimulation:
+    """Прогноз методом Монте-Карло: n_samples реализаций расписания и проекции
+    считаются одним векторным пакетом, а не циклом по get_forecast.
+
+    Для PERIOD прогноз строится на limit_value месяцев, для RATING - на полные 36 месяцев,
+    независимо от того, в каком месяце конкретная реализация достигла оценки"""
+
+    check_forecast_limit(limit_item, limit_value)
+
+    items = as_activity(items)
+
+    schedules = strategy.get_schedules(items, n_samples)
+    items_rating, projections = strategy._get_projections(items, n_samples)
+
+    if limit_item == ForecastLimitItem.RATING:
+        # Расширение до 36 месяцев так же, как в get_forecast
+        extension = (schedules[:, -3:].sum(axis=1) / 3.0).astype(np.int64)
+        schedules = np.hstack([schedules, np.repeat(extension[:, None], 24, axis=1)])
+        projections = np.tile(projections, 3)
+    else:
+        schedules = schedules[:, :limit_value]
+        projections = projections[:, :limit_value]
+
+    totals = strategy._profile(items).total
+
+    items_total = totals.count + np.cumsum(projections + schedules, axis=1)
+    ratings_total = totals.rating_sum + np.cumsum(projections * items_rating + 5 * schedules, axis=1)
+
+    rating_avg = ratings_total / items_total
+
+    target_months = None
+    if limit_item == ForecastLimitItem.RATING:
+        reached = rating_avg >= limit_value
+        months = np.where(reached.any(axis=1), reached.argmax(axis=1) + 1, 0)
+        target_months = np.bincount(months, minlength=rating_avg.shape[1] + 1)
+
+    return ForecastSimulation(
+        rating_mean=rating_avg.mean(axis=0),
+        rating_percentiles={p: np.percentile(rating_avg, p, axis=0) for p in percentiles},
+        target_months=target_months,
+    )
+
+
+def sweep_schedules(strategy: SchedulingStrategy, items, schedules, targets=None, extend: bool = True) -> ScheduleSweep:
+    """Сравнение вариантов расписания постинга для одной сущности.
+    schedules - матрица (количество вариантов x месяцы), не длиннее 36 месяцев.
+    Итоги истории и проекция строятся один раз (проекция - одним вызовом генератора стратегии),
+    все варианты считаются одновременно накопленными суммами.
+
+    Варианты на 12 месяцев при extend расширяются до 36 месяцев так же, как в get_forecast для RATING.
+    Для каждого варианта значения совпадают с помесячным прогнозом get_forecast
+    при той же проекции, targets - целевые оценки для расчета месяца достижения"""
+
+    items = as_activity(items)
+
+    schedules = np.atleast_2d(np.asarray(schedules, dtype=np.int64))
+    assert schedules.shape[1] <= 36, 'Расписание не может быть длиннее 36 месяцев'
+    assert np.all(schedules >= 0), 'Количество постов не может быть отрицательным'
+
+    if extend and schedules.shape[1] == 12:
+        extension = (schedules[:, -3:].sum(axis=1) / 3.0).astype(np.int64)
+        schedules = np.hstack([schedules, np.repeat(extension[:, None], 24, axis=1)])
+
+    projection = strategy._get_projection(items)
+    projection = (projection * 3)[:schedules.shape[1]]
+
+    projected_count = np.array([len(p) for p in projection], dtype=np.int64)
+    projected_sum = np.array([sum(p) for p in projection], dtype=np.float64)
+
+    totals = strategy._profile(items).total
+    n = schedules.shape[0]
+
+    # Итоги истории идут первым столбцом, чтобы порядок накопления совпадал с циклом get_forecast
+    items_total = np.cumsum(np.hstack([
+        np.full((n, 1), totals.count, dtype=np.int64), projected_count + schedules,
+    ]), axis=1)[:, 1:]
+    ratings_total = np.cumsum(np.hstack([
+        np.full((n, 1), totals.rating_sum, dtype=np.float64), projected_sum + 5 * schedules,
+    ]), axis=1)[:, 1:]
+
+    rating_avg = ratings_total / items_total
+
+    target_months = None
+    if targets is not None:
+        targets = np.atleast_1d(np.asarray(targets, dtype=np.float64))
+        for target in targets:
+            check_forecast_limit(ForecastLimitItem.RATING, target)
+
+        target_months = months_to_target(rating_avg, targets)
+
+    return ScheduleSweep(items_total=items_total, rating_avg=rating_avg, target_months=target_months)
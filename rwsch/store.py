@@ -0,0 +1,288 @@
+import os
+
+import numpy as np
+
+from rwsch.history import (
+    ActivityProfile, ReviewBatch, WindowStats, as_history, POSITIVE_RATING_ABOVE, NEGATIVE_RATING_BELOW,
+)
+
+# Строка агрегатов: все отзывы сущности за один день
+ROW_DTYPE = np.dtype([
+    ('date', '<M8[D]'),
+    ('count', '<u4'),
+    ('rating_sum', '<f8'),
+    ('positive', '<u4'),
+    ('negative', '<u4'),
+])
+
+# Запись индекса: строки сущности лежат в срезе [offset, offset + length) файла строк
+INDEX_DTYPE = np.dtype([
+    ('entity', '<U64'),
+    ('offset', '<i8'),
+    ('length', '<i8'),
+])
+
+
+def aggregate_rows(items) -> np.ndarray:
+    """Дневные агрегаты истории отзывов в формате ROW_DTYPE, по возрастанию даты"""
+
+    history = as_history(items)
+
+    if not len(history):
+        return np.zeros(0, dtype=ROW_DTYPE)
+
+    ratings = history.ratings.astype(np.float64)
+    days, starts = np.unique(history.dates, return_index=True)
+
+    rows = np.zeros(len(days), dtype=ROW_DTYPE)
+    rows['date'] = days
+    rows['count'] = np.diff(np.append(starts, len(history)))
+    rows['rating_sum'] = np.add.reduceat(ratings, starts)
+    rows['positive'] = np.add.reduceat(ratings > POSITIVE_RATING_ABOVE, starts, dtype=np.int64)
+    rows['negative'] = np.add.reduceat(ratings < NEGATIVE_RATING_BELOW, starts, dtype=np.int64)
+
+    return rows
+
+
+def rows_profile(rows, today) -> ActivityProfile:
+    """Профиль активности на дату today, построенный по дневным агрегатам"""
+
+    depth = ActivityProfile.DEPTH_DAYS
+
+    ages = (np.datetime64(today, 'D') - rows['date']).astype(np.int64)
+    recent = (ages >= 0) & (ages < depth)
+    recent_ages = ages[recent]
+
+    def by_age(field):
+        return np.bincount(recent_ages, weights=rows[field][recent], minlength=depth)
+
+    return ActivityProfile(
+        today=today,
+        count=by_age('count'),
+        rating_sum=by_age('rating_sum'),
+        positive=by_age('positive'),
+        negative=by_age('negative'),
+        total=WindowStats(
+            count=int(rows['count'].sum()),
+            rating_sum=rows['rating_sum'].sum().item(),
+            positive=int(rows['positive'].sum()),
+            negative=int(rows['negative'].sum()),
+        ),
+        last_date=rows['date'][-1].item() if len(rows) else None,
+    )
+
+
+class AggregateBatch(ReviewBatch):
+    """Пакет сущностей из дневных агрегатов AggregateStore.
+    Совместим с ReviewBatch для SchedulingService.get_strategies:
+    окна считаются по строкам агрегатов с весами, без отдельных отзывов"""
+
+    def __init__(self, rows, offsets, today=None):
+        super().__init__(rows['date'], offsets, today=today)
+
+        self.rows = rows
+
+    def history(self, idx) -> ActivityProfile:
+        """Отдельных отзывов в агрегатах нет, поэтому для сущности возвращается ее профиль активности"""
+
+        lo, hi = self.offsets[idx], self.offsets[idx + 1]
+
+        return rows_profile(self.rows[lo:hi], self.today)
+
+    def window(self, start=0, end=0, today=None) -> WindowStats:
+        assert start < end, 'Дельта окончания должна быть больше дельты начала'
+
+        if today is None:
+            today = self.today
+
+        key = (today, start, end)
+        if key not in self._windows:
+            if self._ages is None or self._ages[0] != today:
+                self._ages = (today, (np.datetime64(today, 'D') - self.dates).astype(np.int64))
+
+            ages = self._ages[1]
+            mask = (ages > start) & (ages < end)
+
+            entities = self.entities[mask]
+            rows = self.rows[mask]
+            n = len(self)
+
+            self._windows[key] = WindowStats(
+                count=np.bincount(entities, weights=rows['count'], minlength=n).astype(np.int64),
+                rating_sum=np.bincount(entities, weights=rows['rating_sum'], minlength=n),
+                positive=np.bincount(entities, weights=rows['positive'], minlength=n).astype(np.int64),
+                negative=np.bincount(entities, weights=rows['negative'], minlength=n).astype(np.int64),
+            )
+
+        return self._windows[key]
+
+
+class AggregateStore:
+    """Файловое хранилище дневных агрегатов отзывов по сущностям.
+
+    Состоит из двух файлов с записями фиксированной ширины: path + '.rows' - строки ROW_DTYPE,
+    path + '.index' - записи INDEX_DTYPE. Строки читаются через memory map, без создания
+    объектов для отдельных отзывов. Оба файла только дописываются: замена истории сущности
+    добавляет ее новые строки и новую запись индекса, которая перекрывает предыдущую,
+    поэтому ежедневное обновление не переписывает весь файл. compact освобождает место
+    от устаревших строк.
+
+    Агрегаты хранятся по дням, а не по календарным месяцам, чтобы окна стратегий,
+    которые задаются в днях, считались так же, как по исходным отзывам.
+
+    compact пишет файлы нового поколения рядом с текущими, а переключается на них одной
+    атомарной заменой файла path + '.generation' с номером поколения. Поэтому при сбое
+    во время compact хранилище остается на прежней согласованной паре файлов"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.generation_path = self.path + '.generation'
+
+        self.generation = 0
+        if os.path.exists(self.generation_path):
+            with open(self.generation_path) as fh:
+                self.generation = int(fh.read())
+
+        self.rows_path, self.index_path = self._paths(self.generation)
+
+        for file_path in (self.rows_path, self.index_path):
+            if not os.path.exists(file_path):
+                open(file_path, 'ab').close()
+
+        self._rows = None
+        self._index = {}
+
+        index = np.fromfile(self.index_path, dtype=INDEX_DTYPE)
+        for record in index:
+            self._index[str(record['entity'])] = (int(record['offset']), int(record['length']))
+
+    def _paths(self, generation):
+        """Файлы строк и индекса поколения generation. У нулевого поколения суффикса нет"""
+
+        suffix = '.%d' % generation if generation else ''
+
+        return self.path + '.rows' + suffix, self.path + '.index' + suffix
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, entity_id):
+        return str(entity_id) in self._index
+
+    @property
+    def entities(self):
+        """Идентификаторы сущностей (строками) в порядке первой записи"""
+        return list(self._index)
+
+    def _mapped_rows(self) -> np.ndarray:
+        if self._rows is None:
+            if os.path.getsize(self.rows_path):
+                self._rows = np.memmap(self.rows_path, dtype=ROW_DTYPE, mode='r')
+            else:
+                self._rows = np.zeros(0, dtype=ROW_DTYPE)
+
+        return self._rows
+
+    def put(self, entity_id, items):
+        """Добавление или замена истории одной сущности"""
+        self.put_many([(entity_id, items)])
+
+    def put_many(self, entities):
+        """Добавление или замена историй для пар (идентификатор сущности, отзывы).
+        Все строки и записи индекса дописываются за одну операцию записи в каждый файл"""
+
+        offset = os.path.getsize(self.rows_path) // ROW_DTYPE.itemsize
+
+        rows_parts = []
+        records = []
+        for entity_id, items in entities:
+            entity = str(entity_id)
+            assert len(entity) <= 64, 'Идентификатор сущности не может быть длиннее 64 символов'
+
+            rows = aggregate_rows(items)
+
+            rows_parts.append(rows)
+            records.append((entity, offset, len(rows)))
+            offset += len(rows)
+
+        if not records:
+            return
+
+        with open(self.rows_path, 'ab') as fh:
+            fh.write(np.concatenate(rows_parts).tobytes())
+
+        with open(self.index_path, 'ab') as fh:
+            fh.write(np.array(records, dtype=INDEX_DTYPE).tobytes())
+
+        for entity, offset, length in records:
+            self._index[entity] = (offset, length)
+
+        # Отображение файла строк нужно пересоздать, чтобы увидеть дописанные строки
+        self._rows = None
+
+    def rows(self, entity_id) -> np.ndarray:
+        """Дневные агрегаты сущности (срез отображенного в память файла)"""
+
+        offset, length = self._index[str(entity_id)]
+
+        return self._mapped_rows()[offset:offset + length]
+
+    def profile(self, entity_id, today) -> ActivityProfile:
+        """Профиль активности сущности на дату today. Его можно передавать
+        в SchedulingService.get_strategy и get_forecast стратегий вместо отзывов"""
+        return rows_profile(self.rows(entity_id), today)
+
+    def batch(self, entity_ids=None, today=None) -> AggregateBatch:
+        """Пакет сущностей для SchedulingService.get_strategies, по умолчанию - все сущности хранилища"""
+
+        if entity_ids is None:
+            entity_ids = self.entities
+
+        spans = np.array([self._index[str(e)] for e in entity_ids], dtype=np.int64).reshape(-1, 2)
+        lengths = spans[:, 1]
+
+        offsets = np.zeros(len(spans) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        # Номера строк всех сущностей подряд: начало среза сущности плюс номер строки внутри нее
+        positions = np.repeat(spans[:, 0] - offsets[:-1], lengths) + np.arange(offsets[-1])
+
+        return AggregateBatch(self._mapped_rows()[positions], offsets, today=today)
+
+    def compact(self):
+        """Перезапись файлов без устаревших строк замененных сущностей в новое поколение"""
+
+        entities = self.entities
+        batch = self.batch(entities)
+
+        index = np.zeros(len(entities), dtype=INDEX_DTYPE)
+        index['entity'] = entities
+        index['offset'] = batch.offsets[:-1]
+        index['length'] = np.diff(batch.offsets)
+
+        generation = self.generation + 1
+        paths = self._paths(generation)
+
+        for file_path, data in zip(paths, (batch.rows, index)):
+            with open(file_path, 'wb') as fh:
+                fh.write(data.tobytes())
+                fh.flush()
+                os.fsync(fh.fileno())
+
+        # Единственная точка переключения: до замены действует старая пара файлов, после - новая
+        with open(self.generation_path + '.tmp', 'w') as fh:
+            fh.write(str(generation))
+            fh.flush()
+            os.fsync(fh.fileno())
+
+        os.replace(self.generation_path + '.tmp', self.generation_path)
+
+        self._rows = None
+        old_paths = (self.rows_path, self.index_path)
+
+        self.generation = generation
+        self.rows_path, self.index_path = paths
+        self._index = {entity: (int(o), int(l)) for entity, o, l in index}
+
+        for file_path in old_paths:
+            os.remove(file_path)
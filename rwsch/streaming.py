@@ -0,0 +1,117 @@
+from datetime import datetime
+
+import numpy as np
+
+from rwsch.history import ActivityProfile, WindowStats, POSITIVE_RATING_ABOVE, NEGATIVE_RATING_BELOW
+
+# Окна, которые используют стратегии и проекция: три последних года и все три года целиком
+DEFAULT_WINDOWS = ((0, 365), (365, 2 * 365), (2 * 365, 3 * 365), (0, 3 * 365))
+
+
+class ActivityAccumulator(ActivityProfile):
+    """Накопитель активности одной сущности для потоковой обработки отзывов.
+    Хранит кольцевой буфер дневных агрегатов на глубину DEPTH_DAYS и поддерживает
+    суммы по отслеживаемым окнам, поэтому новый отзыв, сдвиг даты и запрос
+    агрегатов отслеживаемого окна обходятся в O(1) без повторного обхода истории.
+
+    Накопитель совместим с ActivityProfile, поэтому его можно передавать
+    в SchedulingService и стратегии вместо списка отзывов"""
+
+    def __init__(self, today=None, windows=DEFAULT_WINDOWS):
+        if today is None:
+            today = datetime.now().date()
+
+        for start, end in windows:
+            assert start < end, 'Дельта окончания должна быть больше дельты начала'
+            assert end <= self.DEPTH_DAYS, 'Окно выходит за глубину профиля'
+
+        self.today = today
+        self.last_date = None
+
+        depth = self.DEPTH_DAYS
+        # Поля дневного агрегата: количество, сумма оценок, позитивные, негативные
+        self._days = np.zeros((depth, 4), dtype=np.float64)
+        self._total = np.zeros(4, dtype=np.float64)
+        self._windows = {window: np.zeros(4, dtype=np.float64) for window in windows}
+
+    def _slot(self, age):
+        return (self.today.toordinal() - age) % self.DEPTH_DAYS
+
+    @staticmethod
+    def _stats(values) -> WindowStats:
+        return WindowStats(
+            count=int(values[0]),
+            rating_sum=values[1].item(),
+            positive=int(values[2]),
+            negative=int(values[3]),
+        )
+
+    @property
+    def total(self) -> WindowStats:
+        return self._stats(self._total)
+
+    def add(self, date, rating):
+        """Учет нового отзыва. Отзыв с датой позже текущей сдвигает накопитель на его дату"""
+
+        if date > self.today:
+            self.advance(date)
+
+        if self.last_date is None or date > self.last_date:
+            self.last_date = date
+
+        event = np.array([1, rating, rating > POSITIVE_RATING_ABOVE, rating < NEGATIVE_RATING_BELOW], dtype=np.float64)
+        self._total += event
+
+        age = (self.today - date).days
+        if age >= self.DEPTH_DAYS:
+            return
+
+        self._days[self._slot(age)] += event
+
+        for (start, end), values in self._windows.items():
+            if start < age < end:
+                values += event
+
+    def advance(self, today):
+        """Сдвиг накопителя на новую дату: отзывы стареют, окна смещаются"""
+
+        steps = (today - self.today).days
+        assert steps >= 0, 'Накопитель нельзя сдвинуть назад'
+
+        if steps >= self.DEPTH_DAYS:
+            self._days[:] = 0
+            for values in self._windows.values():
+                values[:] = 0
+
+            self.today = today
+            return
+
+        for _ in range(0, steps):
+            # За день в каждое окно входит день с возрастом start и выходит день с возрастом end - 1
+            for (start, end), values in self._windows.items():
+                values += self._days[self._slot(start)] - self._days[self._slot(end - 1)]
+
+            self.today = self.today.fromordinal(self.today.toordinal() + 1)
+
+            # Слот нового дня раньше занимал день, вышедший за глубину накопителя
+            self._days[self._slot(0)] = 0
+
+    def profile(self, today=None) -> 'ActivityAccumulator':
+        if today is not None:
+            self.advance(today)
+
+        return self
+
+    def window(self, start=0, end=0) -> WindowStats:
+        if (start, end) in self._windows:
+            return self._stats(self._windows[(start, end)])
+
+        return super().window(start, end)
+
+    def _range(self, lo, hi) -> WindowStats:
+        if hi <= lo:
+            return WindowStats(0, 0, 0, 0)
+
+        slots = [self._slot(age) for age in range(lo, hi)]
+
+        return self._stats(self._days[slots].sum(axis=0))
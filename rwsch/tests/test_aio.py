@@ -0,0 +1,147 @@
+import asyncio
+import threading
+from datetime import date, timedelta
+from unittest import TestCase
+
+import numpy as np
+
+from rwsch.aio import AsyncSchedulingService
+from rwsch.instrumentation import StageAggregator
+from rwsch.models import SchedulingStrategy, SchedulingService, ForecastLimitItem, ActivityThreshold
+from rwsch.streaming import ActivityAccumulator
+
+
+class TestItem:
+    def __init__(self, date, rating=0):
+        self.date = date
+        self.rating = rating
+
+
+class TestStrategy(SchedulingStrategy):
+    def get_schedule(self, items):
+        return [1] * 12
+
+    @classmethod
+    def satisfies(cls, items):
+        return len(items) > 0
+
+
+class YearStrategy(SchedulingStrategy):
+    thresholds = [ActivityThreshold(window=(0, 365), divisor=1, minimum=3)]
+
+    def get_schedule(self, items):
+        return [1] * 12
+
+
+class ThreadItem(TestItem):
+    """Отзыв, который запоминает потоки, в которых читалась его дата"""
+
+    threads = set()
+
+    @property
+    def date(self):
+        self.threads.add(threading.get_ident())
+        return self._date
+
+    @date.setter
+    def date(self, value):
+        self._date = value
+
+
+class BlockingStrategy(TestStrategy):
+    released = threading.Event()
+
+    @classmethod
+    def satisfies(cls, items):
+        cls.released.wait(5)
+        return True
+
+
+class AsyncServiceTestCase(TestCase):
+    def test_batched_requests(self):
+        reference_date = date(2019, 6, 1)
+        items = [TestItem(reference_date - timedelta(days=10 * d), 4) for d in range(1, 13)]
+
+        service = SchedulingService([TestStrategy], reference_date=reference_date)
+
+        async def run():
+            async with AsyncSchedulingService(service, max_batch_size=4, max_latency=0.01, max_pending=2) as aservice:
+                strategies = await asyncio.gather(*[aservice.get_strategy(items if i % 2 else []) for i in range(0, 10)])
+                forecast = await aservice.get_forecast(items, ForecastLimitItem.PERIOD, 3, rng=np.random.default_rng(0))
+
+                with self.assertRaises(AssertionError):
+                    await aservice.get_forecast(items, ForecastLimitItem.PERIOD, 20)
+
+            return strategies, forecast
+
+        strategies, forecast = asyncio.run(run())
+
+        self.assertEqual([s is None for s in strategies], [i % 2 == 0 for i in range(0, 10)])
+        self.assertIsInstance(strategies[1], TestStrategy)
+        self.assertEqual(strategies[1].reference_date, reference_date)
+        self.assertEqual(len(forecast), 3)
+
+    def test_items_are_converted_in_executor(self):
+        reference_date = date(2019, 6, 1)
+        items = [ThreadItem(reference_date - timedelta(days=10 * d), 4) for d in range(1, 13)]
+
+        service = SchedulingService([TestStrategy], reference_date=reference_date)
+
+        async def run():
+            async with AsyncSchedulingService(service) as aservice:
+                await aservice.get_strategy(items)
+                await aservice.get_forecast(items, ForecastLimitItem.PERIOD, 3)
+
+        asyncio.run(run())
+
+        self.assertTrue(ThreadItem.threads)
+        self.assertNotIn(threading.get_ident(), ThreadItem.threads)
+
+    def test_close_cancels_pending_requests(self):
+        service = SchedulingService([BlockingStrategy], reference_date=date(2019, 6, 1))
+        items = [TestItem(date(2019, 5, 1), 4)]
+
+        async def run():
+            aservice = AsyncSchedulingService(service, max_batch_size=2, max_latency=0.001, max_pending=2)
+            requests = [asyncio.ensure_future(aservice.get_strategy(items)) for _ in range(0, 6)]
+
+            # Первый пакет уже обрабатывается, следующие ждут в очереди и перед ней
+            await asyncio.sleep(0.05)
+            await aservice.close()
+            BlockingStrategy.released.set()
+
+            return await asyncio.wait_for(asyncio.gather(*requests, return_exceptions=True), 1)
+
+        results = asyncio.run(run())
+
+        self.assertEqual(len(results), 6)
+        self.assertTrue(all(isinstance(r, asyncio.CancelledError) for r in results))
+
+    def test_mixed_inputs(self):
+        reference_date = date(2019, 6, 1)
+        items = [TestItem(reference_date - timedelta(days=10 * d), 4) for d in range(1, 13)]
+
+        accumulator = ActivityAccumulator(today=reference_date)
+        for item in items:
+            accumulator.add(item.date, item.rating)
+
+        sink = StageAggregator()
+        service = SchedulingService([YearStrategy], reference_date=reference_date, sink=sink)
+
+        async def run():
+            async with AsyncSchedulingService(service, max_latency=0.01) as aservice:
+                return await asyncio.gather(
+                    aservice.get_strategy(items),
+                    aservice.get_strategy(accumulator),
+                    aservice.get_strategy([object()]),
+                    aservice.get_strategy(items[:2]),
+                    return_exceptions=True,
+                )
+
+        from_items, from_accumulator, broken, too_few = asyncio.run(run())
+
+        self.assertIsInstance(from_items, YearStrategy)
+        self.assertIs(from_items.sink, sink)
+        self.assertIsInstance(from_accumulator, YearStrategy)
+        self.assertIsInstance(broken, AttributeError)
+        self.assertIsNone(too_few)
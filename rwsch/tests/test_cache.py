@@ -0,0 +1,96 @@
+import os
+import tempfile
+from datetime import date, timedelta
+from unittest import TestCase
+
+import numpy as np
+
+from rwsch.cache import MemoryCache, SQLiteCache, CachingSchedulingService
+from rwsch.models import SchedulingStrategy, SchedulingService, ForecastLimitItem
+
+
+class TestItem:
+    def __init__(self, date, rating=0):
+        self.date = date
+        self.rating = rating
+
+
+class RandomStrategy(SchedulingStrategy):
+    def get_schedule(self, items):
+        return [int(n) for n in self.rng.integers(0, 3, 12)]
+
+    @classmethod
+    def satisfies(cls, items):
+        return True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CacheTestCase(TestCase):
+    def check_backend(self, cache, clock):
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+
+        # 'b' используется реже всего и вытесняется
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+        clock.now += 11
+        self.assertIsNone(cache.get('a'))
+
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_memory_cache(self):
+        clock = FakeClock()
+        self.check_backend(MemoryCache(maxsize=2, ttl=10, clock=clock), clock)
+
+    def test_sqlite_cache(self):
+        clock = FakeClock()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.sqlite')
+
+            cache = SQLiteCache(path, maxsize=2, ttl=10, clock=clock)
+            self.check_backend(cache, clock)
+            cache.set('d', {'rating_avg': 4.5})
+            cache.close()
+
+            cache = SQLiteCache(path, maxsize=2, ttl=10, clock=clock)
+            self.assertEqual(cache.get('d'), {'rating_avg': 4.5})
+            self.assertIn(('cache_accessed',), cache._connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            ).fetchall())
+            cache.close()
+
+    def test_service_forecast(self):
+        reference_date = date(2019, 6, 1)
+        items = [TestItem(reference_date - timedelta(days=5 + d * 11), 1 + d % 5) for d in range(0, 30)]
+
+        service = SchedulingService([RandomStrategy], reference_date=reference_date)
+        cached = CachingSchedulingService(service)
+
+        expected = RandomStrategy(rng=np.random.default_rng(3), reference_date=reference_date).get_forecast(
+            items, ForecastLimitItem.RATING, 4
+        )
+
+        for _ in range(0, 3):
+            self.assertEqual(cached.get_forecast(items, ForecastLimitItem.RATING, 4, seed=3), expected)
+
+        self.assertEqual((cached.cache.hits, cached.cache.misses), (2, 1))
+
+        # Новый отзыв меняет отпечаток истории
+        items.append(TestItem(reference_date - timedelta(days=1), 5))
+        cached.get_forecast(items, ForecastLimitItem.RATING, 4, seed=3)
+        self.assertEqual((cached.cache.hits, cached.cache.misses), (2, 2))
+
+        # Стратегия для прогноза с другим ограничением берется из кеша, но не учитывается в счетчиках
+        cached.get_forecast(items, ForecastLimitItem.PERIOD, 6, seed=3)
+        self.assertEqual((cached.cache.hits, cached.cache.misses), (2, 3))
@@ -0,0 +1,68 @@
+from unittest import TestCase
+
+import numpy as np
+
+from rwsch.models import distribute, distribute_batch
+
+
+def sequential_distribute(n_items, n_receivers, rng):
+    """Исходная пошаговая версия distribute, используется как эталон
+    для проверки статистической эквивалентности векторной версии"""
+
+    receivers = [0 for _ in range(0, n_receivers)]
+
+    while n_items > 0:
+        if n_items >= len(receivers):
+            chance = 100
+        else:
+            chance = int(
+                round(n_items / float(len(receivers)), 2) * 100
+            )
+
+        receiver_idx = 0
+        while True:
+            if chance == 100 or rng.integers(0, 101) <= chance:
+                receivers[receiver_idx] += 1
+                n_items -= 1
+
+            if n_items == 0:
+                break
+
+            if receiver_idx < (len(receivers) - 1):
+                receiver_idx += 1
+            else:
+                break
+
+    return receivers
+
+
+class DistributeTestCase(TestCase):
+    def test_totals_preserved(self):
+        rng = np.random.default_rng(0)
+
+        n_items = np.arange(0, 100)
+        receivers = distribute_batch(n_items, 12, rng=rng)
+
+        self.assertEqual(receivers.shape, (100, 12))
+        self.assertEqual(receivers.sum(axis=1).tolist(), n_items.tolist())
+        self.assertEqual(distribute(0, 12), [0] * 12)
+        self.assertEqual(distribute(24, 12), [2] * 12)
+
+    def test_statistical_equivalence(self):
+        """
+        Векторная версия должна давать то же распределение, что и пошаговая:
+        сравниваем средние по каждому получателю на большом числе испытаний.
+        Пошаговая версия отдает предпочтение первым получателям, это смещение
+        тоже должно сохраниться
+        """
+
+        trials = 5000
+        rng = np.random.default_rng(12345)
+
+        for n_items in [1, 5, 11, 30]:
+            expected = np.array([sequential_distribute(n_items, 12, rng) for _ in range(0, trials)])
+            actual = distribute_batch(np.full(trials, n_items), 12, rng=rng)
+
+            # Стандартная ошибка среднего для одного получателя не превышает 0.5 / sqrt(trials) ~ 0.007
+            np.testing.assert_allclose(actual.mean(axis=0), expected.mean(axis=0), atol=0.04)
+            np.testing.assert_allclose(actual.std(axis=0), expected.std(axis=0), atol=0.04)
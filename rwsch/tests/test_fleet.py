@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+import numpy as np
+
+from rwsch.fleet import FleetRunner, entity_rng, allocate_capacity, allocate_fleet
+from rwsch.models import SchedulingStrategy, ForecastLimitItem
+
+
+class TestItem:
+    def __init__(self, date, rating=0):
+        self.date = date
+        self.rating = rating
+
+
+class RandomStrategy(SchedulingStrategy):
+    def get_schedule(self, items):
+        return [int(n) for n in self.rng.integers(0, 3, 12)]
+
+    @classmethod
+    def satisfies(cls, items):
+        return len(list(items)) > 0
+
+
+class FragileStrategy(RandomStrategy):
+    def get_schedule(self, items):
+        # Как у стратегии прошлой активности без отзывов за последний год
+        if len(items) == 3:
+            raise ZeroDivisionError('division by zero')
+
+        return super().get_schedule(items)
+
+
+class FleetTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        today = datetime.now().date()
+
+        cls.entities = [
+            ('entity-%d' % e, [TestItem(today - timedelta(days=10 + d * 13), 1 + (d + e) % 5) for d in range(0, e % 7)])
+            for e in range(0, 30)
+        ]
+
+    def test_entity_rng_is_deterministic(self):
+        self.assertEqual(entity_rng(1, 'a').integers(0, 1000, 5).tolist(), entity_rng(1, 'a').integers(0, 1000, 5).tolist())
+        self.assertNotEqual(entity_rng(1, 'a').integers(0, 1000, 5).tolist(), entity_rng(2, 'a').integers(0, 1000, 5).tolist())
+
+    def test_results_independent_of_workers_and_chunks(self):
+        sequential = list(FleetRunner([RandomStrategy], seed=7, workers=1, chunk_size=4).run(self.entities))
+        parallel = list(FleetRunner([RandomStrategy], seed=7, workers=2, chunk_size=3).run(
+            iter(self.entities), ForecastLimitItem.PERIOD, 12
+        ))
+
+        self.assertEqual([r.entity_id for r in sequential], [e[0] for e in self.entities])
+        self.assertEqual(sequential, parallel)
+        self.assertIsNone(sequential[0].strategy)
+        self.assertIs(sequential[1].strategy, RandomStrategy)
+
+    def test_entity_errors_do_not_stop_run(self):
+        for workers in (1, 2):
+            results = list(FleetRunner([FragileStrategy], seed=7, workers=workers, chunk_size=4).run(self.entities))
+
+            self.assertEqual([r.entity_id for r in results], [e[0] for e in self.entities])
+
+            for (_, items), result in zip(self.entities, results):
+                if len(items) == 3:
+                    self.assertIsInstance(result.error, ZeroDivisionError)
+                    self.assertIsNone(result.forecast)
+                else:
+                    self.assertIsNone(result.error)
+                    self.assertEqual(result.forecast is None, not items)
+
+        fleet = allocate_fleet(results, capacity=10)
+        self.assertEqual(fleet.demand[3].tolist(), [0] * 12)
+
+    def test_capacity_allocation(self):
+        demand = np.array([[2, 1], [3, 0], [1, 4]])
+
+        allocation = allocate_capacity(demand, [4, 10], priority=[0.5, 1.5, 0.5])
+
+        self.assertEqual(allocation.tolist(), [[1, 1], [3, 0], [0, 4]])
+
+        results = list(FleetRunner([RandomStrategy], seed=3, workers=1).run(self.entities))
+        fleet = allocate_fleet(results, capacity=10, target=5)
+
+        self.assertEqual(fleet.entity_ids, [e for e, _ in self.entities])
+        self.assertTrue(np.all(fleet.allocation <= fleet.demand))
+        self.assertTrue(np.all(fleet.allocation.sum(axis=0) == np.minimum(fleet.demand.sum(axis=0), 10)))
+
+        # Сущность, получившая меньше потребности, не может опережать по приоритету полностью обслуженную
+        for month in range(0, 12):
+            short = fleet.allocation[:, month] < fleet.demand[:, month]
+            served = (fleet.allocation[:, month] > 0) & ~short
+            if short.any() and served.any():
+                self.assertGreaterEqual(fleet.priority[served].min(), fleet.priority[short].max())
@@ -0,0 +1,117 @@
+from datetime import date, timedelta
+from unittest import TestCase
+
+from rwsch.history import ReviewHistory, Review, as_history
+from rwsch.models import Period
+
+
+class TestItem:
+    def __init__(self, date, rating=0):
+        self.date = date
+        self.rating = rating
+
+
+class HistoryTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.items = [
+            TestItem(date(2019, 1, 1), 5),
+            TestItem(date(2019, 1, 1), 2),
+            TestItem(date(2018, 6, 1), 4),
+            TestItem(date(2017, 6, 1), 3),
+        ]
+
+        cls.period = Period(start=date(2019, 6, 1), end=date(2018, 6, 1))
+
+    def test_conversion(self):
+        history = as_history(self.items)
+
+        self.assertIsInstance(history, ReviewHistory)
+        self.assertIs(as_history(history), history)
+        self.assertEqual(len(history), 4)
+        self.assertEqual(
+            [(i.date, i.rating) for i in history],
+            sorted([(i.date, i.rating) for i in self.items], key=lambda i: i[0]),
+        )
+
+    def test_review_records(self):
+        reviews = [Review(i.date, i.rating) for i in self.items]
+
+        self.assertFalse(hasattr(reviews[0], '__dict__'))
+        self.assertEqual(list(as_history(reviews)), list(as_history(self.items)))
+        self.assertIsInstance(next(iter(as_history(reviews))), Review)
+        self.assertEqual(
+            [self.period.satisfied(r) for r in reviews],
+            [self.period.satisfied(i) for i in self.items],
+        )
+
+    def test_period_counts_match_predicate(self):
+        history = as_history(self.items)
+
+        expected = [i for i in self.items if self.period.satisfied(i)]
+
+        self.assertEqual(history.count(self.period), len(expected))
+        self.assertEqual(self.period.count(self.items), len(expected))
+        self.assertEqual(history.rating_sum(self.period), sum(i.rating for i in expected))
+        self.assertEqual(history.positive_count(self.period), 1)
+        self.assertEqual(history.negative_count(self.period), 1)
+        self.assertEqual(list(self.period.mask(history)), [self.period.satisfied(i) for i in self.items])
+
+    def test_mask_keeps_item_order(self):
+        items = [TestItem(date(2019, 1, 1)), TestItem(date(2017, 1, 1)), TestItem(date(2018, 12, 1))]
+
+        self.assertEqual(list(self.period.mask(items)), [True, False, True])
+        self.assertEqual(list(self.period.mask(items)), [self.period.satisfied(i) for i in items])
+
+    def test_index_matches_predicate(self):
+        base = date(2019, 6, 1)
+        items = [TestItem(base - timedelta(days=(d * 37) % 500), (d % 5) + 1) for d in range(0, 200)]
+
+        history = as_history(items)
+
+        for start, end in [(0, 365), (100, 101), (100, 102), (0, 1000), (498, 600)]:
+            period = Period(start=base - timedelta(days=start), end=base - timedelta(days=end))
+            expected = [i for i in items if period.satisfied(i)]
+
+            self.assertEqual(
+                period.stats(history),
+                (
+                    len(expected),
+                    sum(i.rating for i in expected),
+                    sum(1 for i in expected if i.rating > 3),
+                    sum(1 for i in expected if i.rating < 4),
+                ),
+            )
+            self.assertEqual(history.count(period), int(history.mask(period).sum()))
+
+    def test_fractional_ratings(self):
+        history = ReviewHistory([date(2019, 1, 1), date(2019, 1, 2)], [3.5, 4.5])
+
+        self.assertEqual(history.rating_sum(), 8.0)
+        self.assertEqual(history.positive_count(), 2)
+        self.assertEqual(history.negative_count(), 1)
+
+
+class ProfileTestCase(TestCase):
+    def test_windows_match_periods(self):
+        today = date(2019, 6, 1)
+        dates = [today - timedelta(days=d) for d in range(-3, 1200, 7)]
+        ratings = [(d % 5) + 1 for d in range(0, len(dates))]
+
+        history = ReviewHistory(dates, ratings)
+        profile = history.profile(today)
+
+        for start, end in [(0, 365), (365, 730), (730, 1095), (0, 1095), (10, 40)]:
+            period = Period(start=today - timedelta(days=start), end=today - timedelta(days=end))
+
+            stats = profile.window(start, end)
+
+            self.assertEqual(stats.count, history.count(period))
+            self.assertEqual(stats.rating_sum, history.rating_sum(period))
+            self.assertEqual(stats.positive, history.positive_count(period))
+            self.assertEqual(stats.negative, history.negative_count(period))
+
+        self.assertEqual(profile.years, [profile.window(0, 365), profile.window(365, 730), profile.window(730, 1095)])
+        self.assertEqual(sum(m.count for m in profile.months), sum(1 for d in dates if 0 <= (today - d).days < 1095))
+        self.assertEqual(profile.total.count, len(dates))
+        self.assertIs(history.profile(today), profile)
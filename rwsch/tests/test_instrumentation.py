@@ -0,0 +1,51 @@
+import io
+from datetime import date, timedelta
+from unittest import TestCase
+
+from rwsch.instrumentation import StageAggregator
+from rwsch.models import SchedulingStrategy, SchedulingService, ForecastLimitItem, ActivityThreshold
+
+
+class TestItem:
+    def __init__(self, date, rating=0):
+        self.date = date
+        self.rating = rating
+
+
+class HighStrategy(SchedulingStrategy):
+    thresholds = [ActivityThreshold(window=(0, 365), divisor=12, minimum=2)]
+
+    def get_schedule(self, items):
+        return [3] * 12
+
+
+class LowStrategy(HighStrategy):
+    thresholds = [ActivityThreshold(window=(0, 365), divisor=12, minimum=0)]
+
+
+class InstrumentationTestCase(TestCase):
+    def test_aggregated_stages(self):
+        reference_date = date(2019, 6, 1)
+        sink = StageAggregator()
+        service = SchedulingService([HighStrategy, LowStrategy], reference_date=reference_date, sink=sink)
+
+        for n in [30, 5]:
+            items = [TestItem(reference_date - timedelta(days=1 + d * 300 // n), 3) for d in range(0, n)]
+
+            strategy = service.get_strategy(items)
+            strategy.get_forecast(items, ForecastLimitItem.PERIOD, 6)
+
+        summary = sink.summary()
+
+        for stage in ['get_strategy', 'get_schedule', 'projection', 'forecast_loop', 'get_forecast']:
+            self.assertEqual(summary[stage]['count'], 2)
+            self.assertLessEqual(summary[stage]['p50_s'], summary[stage]['p99_s'])
+
+        self.assertEqual(sink.history_sizes, [30, 5])
+        self.assertEqual(sink.strategies, {'HighStrategy': 1, 'LowStrategy': 1})
+        self.assertEqual(sink.satisfies_calls, 3)
+        self.assertEqual(sink.forecast_months, [6, 6])
+
+        output = io.StringIO()
+        sink.report(file=output)
+        self.assertIn('forecast_loop', output.getvalue())
@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import tempfile
+from datetime import date
+from unittest import TestCase
+
+import numpy as np
+
+from rwsch.publication import publication_slots, materialize_calendar
+
+
+class PublicationTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'calendar.db')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_slots_spread_within_month(self):
+        schedules = [[2, 0, 1], [0, 3, 0]]
+
+        entities, months, slots, dates = publication_slots(schedules, date(2019, 1, 15))
+
+        self.assertEqual(entities.tolist(), [0, 0, 0, 1, 1, 1])
+        self.assertEqual(months.tolist(), [1, 1, 3, 2, 2, 2])
+        self.assertEqual(slots.tolist(), [0, 1, 0, 0, 1, 2])
+        self.assertEqual(
+            [str(d) for d in dates],
+            ['2019-02-08', '2019-02-22', '2019-04-16', '2019-03-06', '2019-03-16', '2019-03-26'],
+        )
+
+    def test_materialize_is_idempotent(self):
+        rng = np.random.default_rng(0)
+        schedules = rng.integers(0, 5, size=(100, 12))
+        entity_ids = ['entity-%d' % e for e in range(0, 100)]
+
+        for _ in range(0, 2):
+            report = materialize_calendar(self.path, entity_ids, schedules, date(2019, 6, 1), batch_size=64)
+
+        materialize_calendar(self.path, entity_ids[:10], schedules[:10], date(2019, 7, 1))
+
+        self.assertEqual(report.rows, schedules.sum())
+        self.assertGreater(report.rows_per_second, 0)
+
+        connection = sqlite3.connect(self.path)
+        try:
+            counts = dict(connection.execute(
+                'SELECT reference_date, COUNT(*) FROM publications GROUP BY reference_date'
+            ).fetchall())
+            per_entity = connection.execute(
+                "SELECT COUNT(*) FROM publications WHERE reference_date = '2019-06-01' AND entity_id = 'entity-7'"
+            ).fetchone()[0]
+            bounds = connection.execute(
+                "SELECT MIN(date), MAX(date) FROM publications WHERE reference_date = '2019-06-01'"
+            ).fetchone()
+        finally:
+            connection.close()
+
+        self.assertEqual(counts, {'2019-06-01': schedules.sum(), '2019-07-01': schedules[:10].sum()})
+        self.assertEqual(per_entity, schedules[7].sum())
+        self.assertTrue('2019-07-01' <= bounds[0] and bounds[1] <= '2020-06-30')
+
+    def test_subset_rerun_keeps_other_entities(self):
+        schedules = np.array([[1, 2], [3, 0], [2, 2]])
+        entity_ids = ['a', 'b', 'c']
+
+        materialize_calendar(self.path, entity_ids, schedules, date(2019, 6, 1))
+        materialize_calendar(self.path, ['b'], [[1, 1]], date(2019, 6, 1))
+
+        connection = sqlite3.connect(self.path)
+        try:
+            counts = dict(connection.execute(
+                'SELECT entity_id, COUNT(*) FROM publications GROUP BY entity_id'
+            ).fetchall())
+            plan = connection.execute(
+                "EXPLAIN QUERY PLAN DELETE FROM publications WHERE reference_date = '2019-06-01' AND entity_id = 'b'"
+            ).fetchall()
+        finally:
+            connection.close()
+
+        self.assertEqual(counts, {'a': 3, 'b': 2, 'c': 4})
+        self.assertIn('publications_reference', ' '.join(str(row[-1]) for row in plan))
@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+from datetime import date
+from unittest import TestCase
+
+from rwsch.fleet import FleetRunner
+from rwsch.models import SchedulingStrategy
+from rwsch.readers import read_histories, write_results
+
+
+class TestStrategy(SchedulingStrategy):
+    def get_schedule(self, items):
+        return [1] * 12
+
+    @classmethod
+    def satisfies(cls, items):
+        return len(items) > 2
+
+
+class ReadersTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.rows = [
+            ('a', '2019-01-0%d' % d, d) for d in range(1, 5)
+        ] + [
+            ('b', '2019-02-01T10:00:00', 5),
+        ] + [
+            ('c', '2019-03-0%d' % d, 4) for d in range(1, 8)
+        ]
+
+    def check_histories(self, path):
+        # Маленький пакет, чтобы сущности пересекали границы пакетов
+        histories = list(read_histories(path, chunk_size=3))
+
+        self.assertEqual([entity_id for entity_id, _ in histories], ['a', 'b', 'c'])
+        self.assertEqual([len(h) for _, h in histories], [4, 1, 7])
+        self.assertEqual(histories[0][1].rating_sum(), 10)
+        self.assertEqual(str(histories[1][1].dates[0]), '2019-02-01')
+
+    def test_csv(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'reviews.csv')
+
+            with open(path, 'w') as fh:
+                fh.write('entity_id,date,rating\n')
+                fh.writelines('%s,%s,%s\n' % row for row in self.rows)
+
+            self.check_histories(path)
+
+    def test_jsonl_to_results(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'reviews.jsonl')
+
+            with open(path, 'w') as fh:
+                for entity_id, day, rating in self.rows:
+                    fh.write(json.dumps({'entity_id': entity_id, 'date': day, 'rating': rating}) + '\n')
+
+            self.check_histories(path)
+
+            output = os.path.join(tmp, 'forecasts.jsonl')
+            runner = FleetRunner([TestStrategy], workers=1, chunk_size=2, reference_date=date(2019, 6, 1))
+
+            written = write_results(runner.run(read_histories(path, chunk_size=3)), output)
+            self.assertEqual(written, 3)
+
+            with open(output) as fh:
+                results = [json.loads(line) for line in fh]
+
+            self.assertEqual([r['strategy'] for r in results], ['TestStrategy', None, 'TestStrategy'])
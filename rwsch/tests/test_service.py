@@ -1,7 +1,10 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from unittest import TestCase
 
-from rwsch.models import SchedulingStrategy, SchedulingService
+import numpy as np
+
+from rwsch.history import ReviewBatch, as_history, as_profile
+from rwsch.models import SchedulingStrategy, SchedulingService, ForecastLimitItem, Period, ActivityThreshold
 
 
 class TestItem:
@@ -19,6 +22,19 @@ class TestStrategy(SchedulingStrategy):
         return True
 
 
+class FixedStrategy(TestStrategy):
+    def get_schedule(self, items):
+        return [1, 0, 2, 0, 1, 3, 0, 0, 1, 2, 1, 1]
+
+    def _get_projection(self, items):
+        return [[3.5] * (m % 3) for m in range(0, 12)]
+
+
+class RandomStrategy(TestStrategy):
+    def get_schedule(self, items):
+        return self.rng.integers(0, 4, size=12).tolist()
+
+
 class ServiceTestCase(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -40,3 +56,173 @@ class ServiceTestCase(TestCase):
         strategy = service.get_strategy(self.items)
 
         self.assertIsInstance(strategy, TestStrategy)
+
+    def test_batch_determination_fallback(self):
+        service = SchedulingService([TestStrategy])
+
+        indices = service.get_strategies([self.items, self.items[:3], []])
+
+        self.assertEqual(list(indices), [0, 0, 0])
+
+    def test_forecast_matches_full_recount(self):
+        strategy = FixedStrategy()
+
+        for limit_item, limit_value in [(ForecastLimitItem.PERIOD, 12), (ForecastLimitItem.RATING, 4)]:
+            forecast = strategy.get_forecast(self.items, limit_item, limit_value)
+
+            schedule = strategy.get_schedule(self.items)
+            projection = strategy._get_projection(self.items)
+            if limit_item == ForecastLimitItem.RATING:
+                schedule += [int(sum(schedule[-3:]) / 3.0) for _ in range(0, 24)]
+                projection.extend(projection * 2)
+
+            ratings = [i.rating for i in self.items]
+            for row, items_projected, items_scheduled in zip(forecast, projection, schedule):
+                ratings += items_projected + [5] * items_scheduled
+
+                self.assertEqual(row['items_total'], len(ratings))
+                self.assertAlmostEqual(row['rating_avg'], sum(ratings) / float(len(ratings)))
+
+            self.assertTrue(limit_item == ForecastLimitItem.PERIOD or forecast[-1]['rating_avg'] >= limit_value)
+
+    def test_target_months_match_forecast(self):
+        strategy = FixedStrategy()
+        targets = [1, 3.4, 3.5, 3.55, 4, 4.5, 5]
+
+        expected = []
+        for target in targets:
+            forecast = strategy.get_forecast(self.items, ForecastLimitItem.RATING, target)
+            expected.append(len(forecast) if forecast[-1]['rating_avg'] >= target else 0)
+
+        self.assertEqual(list(strategy.get_target_months(self.items, targets)), expected)
+        self.assertIn(0, expected)
+        self.assertGreater(len(set(expected)), 2)
+
+    def test_forecasts_share_one_timeline(self):
+        reference_date = datetime.strptime('2018-06-01', "%Y-%m-%d").date()
+        limits = [
+            (ForecastLimitItem.PERIOD, 3), (ForecastLimitItem.PERIOD, 12),
+            (ForecastLimitItem.RATING, 4), (ForecastLimitItem.RATING, 4.5), (ForecastLimitItem.RATING, 5),
+        ]
+
+        forecasts = RandomStrategy(np.random.default_rng(7), reference_date).get_forecasts(self.items, limits)
+
+        self.assertEqual(list(forecasts), limits)
+        for limit_item, limit_value in limits:
+            strategy = RandomStrategy(np.random.default_rng(7), reference_date)
+            self.assertEqual(forecasts[(limit_item, limit_value)], strategy.get_forecast(self.items, limit_item, limit_value))
+
+        months = RandomStrategy(np.random.default_rng(7), reference_date).iter_forecast(self.items)
+        self.assertEqual(next(months), forecasts[(ForecastLimitItem.PERIOD, 3)][0])
+        self.assertEqual(len(forecasts[(ForecastLimitItem.RATING, 5)]), 36)
+
+    def test_forecast_sees_appended_reviews(self):
+        reference_date = datetime.strptime('2018-06-01', "%Y-%m-%d").date()
+        service = SchedulingService([FixedStrategy], reference_date=reference_date)
+
+        items = list(self.items)
+        strategy = service.get_strategy(items)
+
+        items += [TestItem(reference_date - timedelta(days=d % 300), 5) for d in range(0, 500)]
+        forecast = strategy.get_forecast(items, ForecastLimitItem.PERIOD, 1)
+
+        self.assertEqual(forecast[0]['items_total'], len(items) + forecast[0]['items_from_sch'])
+
+        # Чтобы не преобразовывать отзывы повторно, можно передать готовую историю
+        history = as_history(items)
+        strategy = service.get_strategy(history)
+        self.assertIs(strategy._profile(history), history.profile(reference_date))
+
+    def test_rng_is_created_lazily(self):
+        strategy = SchedulingService([FixedStrategy]).get_strategy(self.items)
+
+        self.assertIsNone(strategy._rng)
+        self.assertIs(strategy.rng, strategy.rng)
+
+        seeded = RandomStrategy(np.random.default_rng(3))
+        self.assertEqual(seeded.get_schedule(self.items), RandomStrategy(np.random.default_rng(3)).get_schedule(self.items))
+
+    def test_reference_date_is_pinned(self):
+        reference_date = datetime.strptime('2018-06-01', "%Y-%m-%d").date()
+        service = SchedulingService([TestStrategy], reference_date=reference_date)
+
+        strategy = service.get_strategy(self.items)
+
+        self.assertEqual(strategy.reference_date, reference_date)
+        self.assertEqual(strategy._profile(self.items).today, reference_date)
+        self.assertEqual(strategy._profile(self.items).window(0, 365).count, 24)
+
+        period = Period.from_delta(0, 365, today=reference_date)
+        self.assertEqual(period.count(self.items), 24)
+
+    def test_decision_table(self):
+        class ThresholdStrategy(SchedulingStrategy):
+            thresholds = [ActivityThreshold(window=(0, 365), divisor=12, minimum=3)]
+
+            def get_schedule(self, items):
+                return []
+
+        reference_date = datetime.strptime('2018-06-01', "%Y-%m-%d").date()
+        service = SchedulingService([ThresholdStrategy, TestStrategy], reference_date=reference_date)
+
+        # 24 отзыва за год - это 2 в месяц, порог не выполнен, срабатывает стратегия с собственным satisfies
+        self.assertIsInstance(service.get_strategy(self.items), TestStrategy)
+        self.assertIsInstance(service.get_strategy(self.items * 2), ThresholdStrategy)
+        self.assertEqual(list(service.get_strategies([self.items, self.items * 2])), [1, 0])
+
+    def test_custom_satisfies_batch_uses_reference_date(self):
+        class RecentStrategy(TestStrategy):
+            @classmethod
+            def satisfies(cls, items, today=None):
+                return as_profile(items, today).window(0, 365).count >= 3
+
+        reference_date = datetime.strptime('2019-06-01', "%Y-%m-%d").date()
+        recent = [TestItem(date=datetime.strptime('2019-05-%02d' % d, "%Y-%m-%d").date()) for d in (3, 12, 28)]
+        histories = [recent, self.items, recent[:2]]
+
+        service = SchedulingService([RecentStrategy], reference_date=reference_date)
+
+        single = [0 if service.get_strategy(items) else -1 for items in histories]
+
+        batch = ReviewBatch.from_histories(histories, today=datetime.strptime('2018-01-02', "%Y-%m-%d").date())
+        batch_today = batch.today
+
+        self.assertEqual(single, [0, -1, -1])
+        self.assertEqual(list(service.get_strategies(histories)), single)
+        self.assertEqual(list(service.get_strategies(batch)), single)
+        self.assertEqual(batch.today, batch_today)
+
+    def test_threshold_beyond_profile_depth(self):
+        class LongStrategy(SchedulingStrategy):
+            thresholds = [ActivityThreshold(window=(0, 5 * 365), divisor=1, minimum=20)]
+
+            def get_schedule(self, items):
+                return []
+
+        reference_date = datetime.strptime('2022-06-01', "%Y-%m-%d").date()
+        service = SchedulingService([LongStrategy], reference_date=reference_date)
+
+        # Отзывы 2018 года старше трех лет, но попадают в пятилетнее окно
+        single = [0 if service.get_strategy(items) else -1 for items in (self.items, self.items[:10])]
+
+        self.assertEqual(single, [0, -1])
+        self.assertEqual(list(service.get_strategies([self.items, self.items[:10]])), single)
+
+    def test_profile_without_date_is_current(self):
+        class ThresholdStrategy(SchedulingStrategy):
+            thresholds = [ActivityThreshold(window=(0, 365), divisor=12, minimum=2)]
+
+            def get_schedule(self, items):
+                return []
+
+        history = as_history(self.items)
+        service = SchedulingService([ThresholdStrategy], reference_date=datetime.strptime('2018-06-01', "%Y-%m-%d").date())
+
+        self.assertIsInstance(service.get_strategy(history), ThresholdStrategy)
+
+        # Выбор стратегии на закрепленную дату не меняет дату, на которую история считается без явной даты
+        today = datetime.now().date()
+        self.assertEqual(history.profile().today, today)
+        self.assertEqual(ThresholdStrategy()._profile(history).today, today)
+        self.assertFalse(ThresholdStrategy.satisfies(history))
+        self.assertTrue(ThresholdStrategy.satisfies(history, service.reference_date))
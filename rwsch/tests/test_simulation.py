@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+import numpy as np
+
+from rwsch.models import SchedulingStrategy, ForecastLimitItem
+from rwsch.simulation import simulate_forecast, sweep_schedules
+
+
+class TestItem:
+    def __init__(self, date, rating=0):
+        self.date = date
+        self.rating = rating
+
+
+class FixedStrategy(SchedulingStrategy):
+    def get_schedule(self, items):
+        return [1, 0, 2, 0, 1, 3, 0, 0, 1, 2, 1, 1]
+
+    @classmethod
+    def satisfies(cls, items):
+        return True
+
+
+class RandomStrategy(FixedStrategy):
+    def get_schedule(self, items):
+        return [int(n) for n in self.rng.integers(0, 4, 12)]
+
+
+class SimulationTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        today = datetime.now().date()
+
+        # 24 отзыва за последний год распределяются по 2 в месяц без случайности
+        cls.items = [TestItem(today - timedelta(days=20 + d * 10), 1 + d % 4) for d in range(0, 24)]
+
+    def test_deterministic_case_matches_forecast(self):
+        strategy = FixedStrategy(rng=np.random.default_rng(0))
+
+        for limit_item, limit_value in [(ForecastLimitItem.PERIOD, 7), (ForecastLimitItem.RATING, 3)]:
+            forecast = strategy.get_forecast(self.items, limit_item, limit_value)
+            simulation = simulate_forecast(strategy, self.items, limit_item, limit_value, n_samples=50)
+
+            expected = [row['rating_avg'] for row in forecast]
+            np.testing.assert_allclose(simulation.rating_mean[:len(expected)], expected)
+            np.testing.assert_allclose(simulation.rating_percentiles[5][:len(expected)], expected)
+
+            if limit_item == ForecastLimitItem.RATING:
+                self.assertEqual(simulation.target_months[len(forecast)], 50)
+            else:
+                self.assertIsNone(simulation.target_months)
+                self.assertEqual(len(simulation.rating_mean), limit_value)
+
+    def test_bands(self):
+        strategy = RandomStrategy(rng=np.random.default_rng(1))
+
+        simulation = simulate_forecast(strategy, self.items, ForecastLimitItem.RATING, 4, n_samples=500)
+
+        self.assertEqual(simulation.rating_mean.shape, (36,))
+        self.assertEqual(simulation.target_months.sum(), 500)
+        self.assertTrue(np.all(simulation.rating_percentiles[5] <= simulation.rating_percentiles[95]))
+
+    def test_sweep_matches_forecast(self):
+        candidates = [
+            FixedStrategy().get_schedule(self.items),
+            [0] * 12,
+            [3] * 12,
+        ]
+
+        sweep = sweep_schedules(FixedStrategy(rng=np.random.default_rng(0)), self.items, candidates, targets=[3, 4])
+
+        self.assertEqual(sweep.rating_avg.shape, (3, 36))
+        self.assertEqual(sweep.target_months.shape, (3, 2))
+
+        for i, schedule in enumerate(candidates):
+            strategy = FixedStrategy(rng=np.random.default_rng(0))
+            strategy.get_schedule = lambda items, schedule=schedule: list(schedule)
+
+            for j, target in enumerate([3, 4]):
+                forecast = strategy.get_forecast(self.items, ForecastLimitItem.RATING, target)
+                months = len(forecast) if forecast[-1]['rating_avg'] >= target else 0
+
+                self.assertEqual(sweep.target_months[i, j], months)
+                self.assertEqual(list(sweep.rating_avg[i, :len(forecast)]), [row['rating_avg'] for row in forecast])
@@ -0,0 +1,124 @@
+import os
+import tempfile
+from datetime import date, timedelta
+from unittest import TestCase, mock
+
+import numpy as np
+
+from rwsch.history import as_history
+from rwsch.models import SchedulingStrategy, SchedulingService, ForecastLimitItem, ActivityThreshold
+from rwsch.store import AggregateStore
+
+
+class TestItem:
+    def __init__(self, date, rating=0):
+        self.date = date
+        self.rating = rating
+
+
+class ThresholdStrategy(SchedulingStrategy):
+    thresholds = [ActivityThreshold(window=(0, 365), divisor=12, minimum=1)]
+
+    def get_schedule(self, items):
+        return self.rng.integers(0, 3, size=12).tolist()
+
+
+class StoreTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.reference_date = date(2019, 6, 1)
+
+        rng = np.random.default_rng(0)
+        cls.histories = {
+            'entity-%d' % e: [
+                TestItem(cls.reference_date - timedelta(days=int(d)), int(r))
+                for d, r in zip(rng.integers(0, 1500, size=n), rng.integers(1, 6, size=n))
+            ]
+            for e, n in enumerate([0, 3, 40, 200])
+        }
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'aggregates')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_profiles_match_histories(self):
+        AggregateStore(self.path).put_many(self.histories.items())
+        store = AggregateStore(self.path)
+
+        self.assertEqual(store.entities, list(self.histories))
+
+        for entity_id, items in self.histories.items():
+            expected = as_history(items).profile(self.reference_date)
+            profile = store.profile(entity_id, self.reference_date)
+
+            self.assertEqual(profile.total, expected.total)
+            self.assertEqual(profile.last_date, expected.last_date)
+            for window in [(0, 365), (30, 400), (730, 1095)]:
+                self.assertEqual(profile.window(*window), expected.window(*window))
+
+    def test_service_and_forecast(self):
+        store = AggregateStore(self.path)
+        store.put_many(self.histories.items())
+
+        service = SchedulingService([ThresholdStrategy], reference_date=self.reference_date)
+
+        self.assertEqual(
+            list(service.get_strategies(store.batch())),
+            list(service.get_strategies(list(self.histories.values()))),
+        )
+
+        items = self.histories['entity-3']
+        forecasts = []
+        for activity in [items, store.profile('entity-3', self.reference_date)]:
+            strategy = service.get_strategy(activity, rng=np.random.default_rng(1))
+            forecasts.append(strategy.get_forecast(activity, ForecastLimitItem.PERIOD, 12))
+
+        self.assertEqual(forecasts[0], forecasts[1])
+
+    def test_replace_and_compact(self):
+        store = AggregateStore(self.path)
+        store.put_many(self.histories.items())
+        size = os.path.getsize(store.rows_path)
+
+        replacement = self.histories['entity-2'][:5]
+        store.put('entity-2', replacement)
+
+        self.assertGreater(os.path.getsize(store.rows_path), size)
+        self.assertEqual(AggregateStore(self.path).profile('entity-2', self.reference_date).total,
+                         as_history(replacement).stats())
+
+        store.compact()
+        reopened = AggregateStore(self.path)
+
+        self.assertLess(os.path.getsize(reopened.rows_path), size)
+        self.assertEqual(len(reopened), len(self.histories))
+        self.assertEqual(reopened.profile('entity-2', self.reference_date).total, as_history(replacement).stats())
+        self.assertEqual(reopened.profile('entity-3', self.reference_date).total,
+                         as_history(self.histories['entity-3']).stats())
+
+    def test_interrupted_compact_keeps_previous_files(self):
+        store = AggregateStore(self.path)
+        store.put_many(self.histories.items())
+        store.put('entity-2', self.histories['entity-2'][:5])
+
+        expected = {e: store.profile(e, self.reference_date).total for e in store.entities}
+
+        # Сбой после записи файлов нового поколения, но до переключения на него
+        with mock.patch('rwsch.store.os.replace', side_effect=OSError('crash')):
+            with self.assertRaises(OSError):
+                store.compact()
+
+        reopened = AggregateStore(self.path)
+        self.assertEqual(reopened.generation, 0)
+        self.assertEqual({e: reopened.profile(e, self.reference_date).total for e in reopened.entities}, expected)
+
+        reopened.compact()
+        reopened.compact()
+        self.assertEqual(AggregateStore(self.path).generation, 2)
+        self.assertFalse(os.path.exists(self.path + '.rows'))
+        self.assertEqual(
+            {e: AggregateStore(self.path).profile(e, self.reference_date).total for e in reopened.entities}, expected
+        )
@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+from unittest import TestCase
+
+import numpy as np
+
+from rwsch.history import ReviewHistory, as_profile
+from rwsch.models import SchedulingStrategy, SchedulingService, ForecastLimitItem
+from rwsch.streaming import ActivityAccumulator
+
+
+class YearStrategy(SchedulingStrategy):
+    def get_schedule(self, items):
+        return [1] * 12
+
+    @classmethod
+    def satisfies(cls, items):
+        return as_profile(items).window(0, 365).count >= 3
+
+
+class StreamingTestCase(TestCase):
+    def test_matches_batch_profile(self):
+        rng = np.random.default_rng(3)
+        start = date(2016, 1, 1)
+
+        days = rng.integers(0, 1500, 400)
+        ratings = rng.integers(1, 6, 400)
+
+        events = [(start + timedelta(days=int(d)), int(r)) for d, r in zip(days, ratings)]
+        events.sort(key=lambda e: e[0])
+
+        accumulator = ActivityAccumulator(today=start)
+        for day, rating in events:
+            accumulator.add(day, rating)
+
+        for today in [events[-1][0], events[-1][0] + timedelta(days=100), events[-1][0] + timedelta(days=900)]:
+            accumulator.advance(today)
+
+            dates = [e[0] for e in events]
+            expected = ReviewHistory(dates, [e[1] for e in events]).profile(today)
+
+            for window in [(0, 365), (365, 730), (730, 1095), (0, 1095), (30, 90)]:
+                self.assertEqual(accumulator.window(*window), expected.window(*window))
+
+            self.assertEqual(accumulator.years, expected.years)
+            self.assertEqual(accumulator.total, expected.total)
+
+    def test_classification(self):
+        today = date(2019, 6, 1)
+        accumulator = ActivityAccumulator(today=today)
+        service = SchedulingService([YearStrategy], reference_date=today)
+
+        for days in [10, 20]:
+            accumulator.add(today - timedelta(days=days), 5)
+        self.assertIsNone(service.get_strategy(accumulator))
+
+        accumulator.add(today, 4)
+        # Сервис сдвигает накопитель на свою дату расчета
+        service.reference_date = today + timedelta(days=1)
+        strategy = service.get_strategy(accumulator)
+        self.assertIsInstance(strategy, YearStrategy)
+        self.assertEqual(accumulator.today, service.reference_date)
+
+        forecast = strategy.get_forecast(accumulator, ForecastLimitItem.PERIOD, 3)
+        self.assertEqual([row['items_from_sch'] for row in forecast], [1, 1, 1])
+
+        service.reference_date = today + timedelta(days=360)
+        self.assertIsNone(service.get_strategy(accumulator))